@@ -0,0 +1,102 @@
+from collections import Counter
+from typing import Iterable
+
+from orders_model import Order, parse_orders, product_key, product_title, to_cents
+
+
+# ---------- Order summaries ----------
+class OrderSummary:
+    """
+    Running totals for a stream of orders, so a window never has to sit in memory.
+    Money is accumulated in integer cents, so long windows don't drift.
+    Line items are grouped by product id (see orders_model.product_key).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.revenue_cents = 0
+        self.units = Counter()          # product key -> units
+        self.rev_cents = Counter()      # product key -> revenue cents
+        self.titles: dict[int, str] = {}    # product id -> latest line-item title
+
+    @property
+    def revenue(self) -> float:
+        return self.revenue_cents / 100
+
+    @property
+    def rev_by_title(self) -> Counter:
+        out = Counter()
+        for k, c in self.rev_cents.items():
+            out[product_title(k, None, self.titles)] += c / 100
+        return out
+
+    def merge(self, count: int, revenue_cents: int, units: dict, rev_cents: dict,
+              titles: dict[int, str] | None = None) -> None:
+        """Fold in a pre-aggregated bucket (e.g. a daily rollup or another summary)."""
+        self.count += count
+        self.revenue_cents += revenue_cents
+        self.units.update(units)
+        self.rev_cents.update(rev_cents)
+        if titles:
+            self.titles.update(titles)
+
+    def add(self, o: dict) -> None:
+        self.count += 1
+        self.revenue_cents += to_cents(o.get("total_price"))
+        for li in (o.get("line_items") or []):
+            title = li.get("title", "Unknown")
+            pid = li.get("product_id")
+            if pid is not None:
+                self.titles[pid] = title
+            key = product_key(pid, title)
+            q = int(li.get("quantity") or 0)
+            self.units[key] += q
+            self.rev_cents[key] += q * to_cents(li.get("price"))
+
+    def add_compact(self, o: Order) -> None:
+        self.count += 1
+        self.revenue_cents += o.total_cents
+        for li in o.items:
+            pid = li.product_id
+            if pid is None:
+                key = li.title
+            else:
+                key = pid
+                self.titles[pid] = li.title
+            self.units[key] += li.quantity
+            self.rev_cents[key] += li.quantity * li.price_cents
+
+    def add_orders(self, orders: Iterable[Order]) -> None:
+        """One page of compact orders (see orders_model.parse_orders)."""
+        for o in orders:
+            self.add_compact(o)
+
+    def add_page(self, body: bytes) -> None:
+        """One raw orders.json response body."""
+        self.add_orders(parse_orders(body))
+
+    def result(self, top_n: int = 3, names: dict[int, str] | None = None) -> dict:
+        """Totals and top products; `names` (product id -> current title, e.g. the catalog) wins over line-item titles."""
+        aov = (self.revenue_cents / self.count / 100) if self.count else 0.0
+        top = []
+        for key, qty in self.units.most_common(top_n):
+            top.append({
+                "product_id": None if isinstance(key, str) else key,
+                "title": product_title(key, names, self.titles),
+                "units": qty,
+                "revenue": self.rev_cents[key] / 100,
+            })
+        return {
+            "orders_count": self.count,
+            "revenue": self.revenue_cents / 100,
+            "aov": round(aov, 2),
+            "top_products": top,
+        }
+
+
+def summarize_orders(orders: Iterable[dict], top_n: int = 3) -> dict:
+    summary = OrderSummary()
+    for o in orders:
+        summary.add(o)
+    return summary.result(top_n)
+
@@ -0,0 +1,118 @@
+"""
+Offline accuracy/latency benchmark for the tiered intent router.
+
+    python bench/intent_benchmark.py                  # local tier only
+    python bench/intent_benchmark.py --llm            # also score the LLM tier (needs OPENAI_API_KEY)
+    python bench/intent_benchmark.py --out intent.json
+
+For each confidence threshold it reports how many questions the local tier
+would answer on its own, how accurate those answers are, and the end-to-end
+accuracy and latency when everything below the threshold goes to the LLM.
+Output is JSON so results can be diffed between runs.
+"""
+from pathlib import Path
+import argparse, asyncio, json, statistics, sys, time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from intent_router import classify_local  # noqa: E402
+
+LABELS = Path(__file__).with_name("intent_labels.jsonl")
+THRESHOLDS = (0.0, 0.5, 0.6, 0.75, 0.8, 0.9, 0.95)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def correct(pred: dict, row: dict) -> bool:
+    return pred["intent"] == row["intent"] and pred["range_days"] == row["range_days"]
+
+
+def time_local(rows: list[dict], repeat: int) -> tuple[list, list[float]]:
+    routes, micros = [], []
+    for row in rows:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            route = classify_local(row["question"])
+        micros.append((time.perf_counter() - start) / repeat * 1e6)
+        routes.append(route)
+    return routes, micros
+
+
+def llm_predictions(rows: list[dict]) -> tuple[list[dict], list[float]]:
+    import main  # builds the OpenAI client from backend/.env
+    if main.openai_client() is None:
+        raise SystemExit("--llm needs OPENAI_API_KEY")
+
+    async def run() -> tuple[list[dict], list[float]]:
+        preds, millis = [], []
+        for row in rows:
+            start = time.perf_counter()
+            preds.append((await main.classify_intent_llm(row["question"]))[0])    # labels are single-intent
+            millis.append((time.perf_counter() - start) * 1e3)
+        return preds, millis
+
+    return asyncio.run(run())
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--llm", action="store_true")
+    ap.add_argument("--repeat", type=int, default=200, help="local timing repetitions per question")
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+
+    rows = [json.loads(line) for line in LABELS.read_text().splitlines() if line.strip()]
+    routes, local_us = time_local(rows, args.repeat)
+    llm, llm_ms = llm_predictions(rows) if args.llm else (None, None)
+
+    report = {
+        "questions": len(rows),
+        "local": {
+            "accuracy": round(sum(correct(r.as_choice(), row) for r, row in zip(routes, rows)) / len(rows), 3),
+            "latency_us": {"p50": round(percentile(local_us, 50), 1), "p95": round(percentile(local_us, 95), 1)},
+        },
+        "llm": None if llm is None else {
+            "accuracy": round(sum(correct(p, row) for p, row in zip(llm, rows)) / len(rows), 3),
+            "latency_ms": {"p50": round(percentile(llm_ms, 50), 1), "p95": round(percentile(llm_ms, 95), 1)},
+        },
+        "thresholds": [],
+    }
+    for threshold in THRESHOLDS:
+        local_idx = [i for i, r in enumerate(routes) if r.confidence >= threshold]
+        entry = {
+            "threshold": threshold,
+            "local_share": round(len(local_idx) / len(rows), 3),
+            "local_accuracy": round(
+                sum(correct(routes[i].as_choice(), rows[i]) for i in local_idx) / len(local_idx), 3
+            ) if local_idx else None,
+        }
+        if llm is not None:
+            # tiered: local above the threshold, LLM below it
+            hits = sum(
+                correct(routes[i].as_choice() if i in local_idx else llm[i], rows[i]) for i in range(len(rows))
+            )
+            cost = [local_us[i] / 1e3 if i in local_idx else llm_ms[i] for i in range(len(rows))]
+            entry["tiered_accuracy"] = round(hits / len(rows), 3)
+            entry["tiered_latency_ms"] = {"mean": round(statistics.mean(cost), 2), "p95": round(percentile(cost, 95), 2)}
+        report["thresholds"].append(entry)
+
+    misses = [
+        {"question": row["question"], "expected": [row["intent"], row["range_days"]],
+         "got": [r.intent, r.range_days], "confidence": r.confidence}
+        for r, row in zip(routes, rows) if not correct(r.as_choice(), row)
+    ]
+    report["local_misses"] = misses
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Load and latency benchmark for the backend against a fake Shopify and a fake OpenAI.
+
+    python bench/load_benchmark.py
+    python bench/load_benchmark.py --scenarios chat orders_today --concurrency 1 8 32 --requests 200 \\
+        --latency-ms 60 --throttle-rate 0.02 --token-ms 20 --out load.json
+    python bench/load_benchmark.py --baseline load.json --tolerance 0.2
+
+Starts scripts/fake_shopify.py, scripts/fake_openai.py and the app (uvicorn)
+on free local ports, then for every scenario x concurrency pair restarts the
+app (so caches start cold), fires `--requests` requests from `concurrency`
+workers and reports throughput, latency and time-to-first-byte percentiles,
+errors and upstream Shopify/OpenAI calls per request as JSON. With
+--baseline, exits 1 if p95 latency or throughput regressed by more than
+--tolerance against the matching rows of an earlier report.
+"""
+from pathlib import Path
+import argparse, asyncio, itertools, json, os, socket, subprocess, sys, time
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHAT_QUESTIONS = [
+    "How are sales doing this week?",
+    "How many orders today?",
+    "What are my top sellers this month?",
+    "How did we do compared to last month?",
+    "Give me a quick rundown of the shop",
+]
+
+# name -> (method, path, json bodies cycled per request)
+SCENARIOS = {
+    "orders_today": ("GET", "/orders_today", None),
+    "orders_last_7d": ("GET", "/orders_last_7d", None),
+    "top_selling_30d": ("GET", "/top_selling_30d", None),
+    "sales_overview": ("POST", "/chat", [{"question": "How are sales doing this week?"}]),
+    "chat": ("POST", "/chat", [{"question": q} for q in CHAT_QUESTIONS]),
+    "chat_stream": ("POST", "/chat/stream", [{"question": q} for q in CHAT_QUESTIONS]),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(args: list[str], env: dict | None = None, cwd: Path = ROOT) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"process serving {url} exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"{url} not ready after {timeout}s")
+
+
+def stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        # nearest-rank percentile
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "p50": round(rank(50), 2),
+        "p95": round(rank(95), 2),
+        "p99": round(rank(99), 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+async def stats(url: str) -> dict:
+    async with httpx.AsyncClient() as c:
+        return (await c.get(url)).json()
+
+
+async def drive(base_url: str, scenario: str, concurrency: int, requests: int) -> dict:
+    method, path, bodies = SCENARIOS[scenario]
+    cycle = itertools.cycle(bodies or [None])
+    queue = itertools.islice(cycle, requests)
+    latencies, ttfbs, errors = [], [], 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        for body in queue:      # shared iterator: workers pull until `requests` are done
+            start = time.perf_counter()
+            first = None
+            try:
+                async with client.stream(method, path, json=body) as r:
+                    async for _ in r.aiter_raw():
+                        if first is None:
+                            first = time.perf_counter()
+                    if r.status_code >= 400:
+                        errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            end = time.perf_counter()
+            latencies.append((end - start) * 1000)
+            ttfbs.append(((first or end) - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "latency_ms": percentiles(latencies),
+        "ttfb_ms": percentiles(ttfbs),
+    }
+
+
+async def run_cell(args, scenario: str, concurrency: int, env: dict, shopify_stats: str, openai_stats: str) -> dict:
+    app_port = free_port()
+    app = start(["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                 "--log-level", "warning"], env)
+    base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        wait_ready(f"{base_url}/ping", app)
+        if args.warmup:
+            await drive(base_url, scenario, 1, args.warmup)
+        shop_before, oai_before = await stats(shopify_stats), await stats(openai_stats)
+        row = await drive(base_url, scenario, concurrency, args.requests)
+        shop_after, oai_after = await stats(shopify_stats), await stats(openai_stats)
+    finally:
+        stop(app)
+    n = args.requests
+    row["upstream_per_request"] = {
+        "shopify": round((shop_after["calls"] - shop_before["calls"]) / n, 3),
+        "shopify_throttled": round((shop_after["throttled"] - shop_before["throttled"]) / n, 3),
+        "openai": round((oai_after["calls"] - oai_before["calls"]) / n, 3),
+    }
+    return row
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Rows whose p95 latency rose, or throughput fell, by more than `tolerance`."""
+    old = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    problems = []
+    for row in report["results"]:
+        prev = old.get((row["scenario"], row["concurrency"]))
+        if prev is None:
+            continue
+        label = f"{row['scenario']}@{row['concurrency']}"
+        p95, prev_p95 = row["latency_ms"]["p95"], prev["latency_ms"]["p95"]
+        if p95 and prev_p95 and p95 > prev_p95 * (1 + tolerance):
+            problems.append(f"{label}: p95 {prev_p95}ms -> {p95}ms")
+        rps, prev_rps = row["throughput_rps"], prev["throughput_rps"]
+        if rps and prev_rps and rps < prev_rps * (1 - tolerance):
+            problems.append(f"{label}: throughput {prev_rps} -> {rps} req/s")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["orders_today", "sales_overview", "chat"])
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=100, help="measured requests per scenario x concurrency")
+    ap.add_argument("--warmup", type=int, default=0, help="unmeasured sequential requests before each run")
+    ap.add_argument("--orders", type=int, default=3000, help="fake Shopify order volume")
+    ap.add_argument("--days", type=int, default=90, help="spread fake orders over this many days")
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="fake Shopify latency per call")
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of Shopify calls answered with 429")
+    ap.add_argument("--retry-after", type=float, default=0.5)
+    ap.add_argument("--first-token-ms", type=float, default=300.0, help="fake OpenAI time to first token")
+    ap.add_argument("--token-ms", type=float, default=25.0, help="fake OpenAI time per streamed token")
+    ap.add_argument("--no-openai", action="store_true", help="run the app without OPENAI_API_KEY (local fallbacks)")
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra env for the app")
+    ap.add_argument("--out", type=Path)
+    ap.add_argument("--baseline", type=Path, help="earlier report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    args = ap.parse_args()
+
+    shop_port, oai_port = free_port(), free_port()
+    fakes = [
+        start(["scripts/fake_shopify.py", "--port", str(shop_port), "--orders", str(args.orders),
+               "--days", str(args.days), "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+               "--throttle-rate", str(args.throttle_rate), "--retry-after", str(args.retry_after)]),
+        start(["scripts/fake_openai.py", "--port", str(oai_port),
+               "--first-token-ms", str(args.first_token_ms), "--token-ms", str(args.token_ms)]),
+    ]
+    shopify_stats = f"http://127.0.0.1:{shop_port}/_stats"
+    openai_stats = f"http://127.0.0.1:{oai_port}/_stats"
+    env = dict(
+        os.environ,
+        SHOPIFY_STORE_DOMAIN="bench.myshopify.com",
+        SHOPIFY_ACCESS_TOKEN="bench",
+        SHOPIFY_API_BASE=f"http://127.0.0.1:{shop_port}",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{oai_port}/v1",
+        OPENAI_API_KEY="" if args.no_openai else "bench",
+        ORDER_STORE_PATH="",
+    )
+    env.update(kv.split("=", 1) for kv in args.env)
+
+    results = []
+    try:
+        wait_ready(shopify_stats, fakes[0])
+        wait_ready(openai_stats, fakes[1])
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                row = asyncio.run(run_cell(args, scenario, concurrency, env, shopify_stats, openai_stats))
+                results.append(row)
+                print(f"{scenario:>16} c={concurrency:<3} {row['throughput_rps']:>8} req/s  "
+                      f"p50 {row['latency_ms']['p50']}ms  p95 {row['latency_ms']['p95']}ms  "
+                      f"p99 {row['latency_ms']['p99']}ms  shopify/req {row['upstream_per_request']['shopify']}  "
+                      f"openai/req {row['upstream_per_request']['openai']}  errors {row['errors']}",
+                      file=sys.stderr)
+    finally:
+        for proc in fakes:
+            stop(proc)
+
+    report = {
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()
+                   if k not in ("out", "baseline")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    print(text)
+
+    if args.baseline:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
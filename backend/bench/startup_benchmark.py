@@ -0,0 +1,156 @@
+"""
+Cold-start benchmark: import time of main.py and time until the app answers.
+
+    python bench/startup_benchmark.py
+    python bench/startup_benchmark.py --runs 10 --top 15 --out startup.json
+    python bench/startup_benchmark.py --baseline startup.json --tolerance 0.2
+
+Import time comes from `python -X importtime -c "import main"` (median of
+--runs fresh interpreters), with the slowest modules by cumulative and self
+time. Startup is measured per OpenAI mode (OPENAI_PRELOAD=1: client imported
+in the background by the lifespan; 0: on the first chat): milliseconds from
+spawning uvicorn until /ping answers, then the latency of the first /chat
+that needs the LLM, against scripts/fake_shopify.py and scripts/fake_openai.py.
+With --baseline, exits 1 if import or ready time regressed by more than
+--tolerance.
+"""
+from pathlib import Path
+import argparse, json, os, re, statistics, subprocess, sys, time
+
+import httpx
+
+from load_benchmark import ROOT, free_port, start, stop, wait_ready
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+FIRST_CHAT = {"question": "Give me a quick rundown of the shop"}    # not matched locally: goes to the LLM
+
+
+def import_times(env: dict) -> dict[str, tuple[int, int, int]]:
+    """{module: (self us, cumulative us, nesting depth)} for one fresh `import main`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    out = {}
+    for m in IMPORT_LINE.finditer(proc.stderr):
+        out[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return out
+
+
+def import_report(env: dict, runs: int, top: int) -> dict:
+    samples = [import_times(env) for _ in range(runs)]
+    main_ms = [s["main"][1] / 1000 for s in samples]
+    last = samples[-1]
+    by_cumulative = sorted(((m, c) for m, (_, c, depth) in last.items() if depth == 1), key=lambda x: -x[1])
+    by_self = sorted(((m, s) for m, (s, _, _) in last.items()), key=lambda x: -x[1])
+    return {
+        "main_ms": {"median": round(statistics.median(main_ms), 1), "min": round(min(main_ms), 1)},
+        "modules": len(last),
+        "top_cumulative_ms": {m: round(c / 1000, 1) for m, c in by_cumulative[:top]},
+        "top_self_ms": {m: round(s / 1000, 1) for m, s in by_self[:top]},
+    }
+
+
+def wait_ping(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> float:
+    # finer-grained than load_benchmark.wait_ready: we are timing this
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"app exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise SystemExit(f"{url} not ready after {timeout}s")
+
+
+def startup_run(env: dict) -> tuple[float, float]:
+    port = free_port()
+    started = time.perf_counter()
+    app = start(["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"], env)
+    try:
+        ready = wait_ping(f"http://127.0.0.1:{port}/ping", app)
+        t = time.perf_counter()
+        httpx.post(f"http://127.0.0.1:{port}/chat", json=FIRST_CHAT, timeout=60.0).raise_for_status()
+        first_chat = time.perf_counter() - t
+    finally:
+        stop(app)
+    return (ready - started) * 1000, first_chat * 1000
+
+
+def startup_report(env: dict, runs: int) -> dict:
+    report = {}
+    for mode, preload in (("preload", "1"), ("lazy", "0")):
+        ready, chat = zip(*(startup_run(dict(env, OPENAI_PRELOAD=preload)) for _ in range(runs)))
+        report[mode] = {
+            "ready_ms": round(statistics.median(ready), 1),
+            "first_chat_ms": round(statistics.median(chat), 1),
+        }
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    pairs = [("import", report["import"]["main_ms"]["median"], baseline.get("import", {}).get("main_ms", {}).get("median"))]
+    for mode, row in report["startup"].items():
+        pairs.append((f"{mode} ready", row["ready_ms"], baseline.get("startup", {}).get(mode, {}).get("ready_ms")))
+    for label, now, before in pairs:
+        if now and before and now > before * (1 + tolerance):
+            problems.append(f"{label}: {before}ms -> {now}ms")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="fake Shopify latency per call")
+    ap.add_argument("--first-token-ms", type=float, default=300.0, help="fake OpenAI time to first token")
+    ap.add_argument("--out", type=Path)
+    ap.add_argument("--baseline", type=Path, help="earlier report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    args = ap.parse_args()
+
+    shop_port, oai_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        SHOPIFY_STORE_DOMAIN="bench.myshopify.com",
+        SHOPIFY_ACCESS_TOKEN="bench",
+        SHOPIFY_API_BASE=f"http://127.0.0.1:{shop_port}",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{oai_port}/v1",
+        OPENAI_API_KEY="bench",
+        ORDER_STORE_PATH="",
+    )
+    report = {"python": sys.version.split()[0], "import": import_report(env, args.runs, args.top)}
+    print(f"import main: {report['import']['main_ms']['median']}ms median", file=sys.stderr)
+
+    fakes = [
+        start(["scripts/fake_shopify.py", "--port", str(shop_port), "--orders", "500",
+               "--latency-ms", str(args.latency_ms), "--jitter-ms", "0"]),
+        start(["scripts/fake_openai.py", "--port", str(oai_port), "--first-token-ms", str(args.first_token_ms)]),
+    ]
+    try:
+        wait_ready(f"http://127.0.0.1:{shop_port}/_stats", fakes[0])
+        wait_ready(f"http://127.0.0.1:{oai_port}/_stats", fakes[1])
+        report["startup"] = startup_report(env, args.runs)
+    finally:
+        for proc in fakes:
+            stop(proc)
+    for mode, row in report["startup"].items():
+        print(f"{mode:>8}: ready {row['ready_ms']}ms  first chat {row['first_chat_ms']}ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    print(text)
+
+    if args.baseline:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark the dict-based and columnar order summarizers on synthetic windows.
+
+    python bench/summary_benchmark.py
+    python bench/summary_benchmark.py --sizes 10000 100000 300000 --products 500 --out summary.json
+
+Sizes are line-item counts. Each engine gets the same synthetic orders as
+raw orders.json pages (REST shape: 250 orders a page, string prices, 1-5
+line items each) and consumes them the way the backend does, one raw page
+at a time through `add_page()`. Results are checked for
+equality, and wall time plus tracemalloc peak are reported as JSON;
+`loads_ms` is the JSON decoding alone, which both engines pay.
+"""
+from pathlib import Path
+import argparse, json, random, sys, time, tracemalloc
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from analytics import OrderSummary  # noqa: E402
+from columnar import ColumnarSummary, np  # noqa: E402
+from orders_model import loads  # noqa: E402
+
+ENGINES = {"dict": OrderSummary, "columnar": ColumnarSummary}
+PAGE_SIZE = 250
+
+
+def synthetic_orders(line_items: int, products: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    prices = {p: f"{rng.randint(100, 20000) / 100:.2f}" for p in range(products)}
+    orders, made, oid = [], 0, 1
+    while made < line_items:
+        n = min(rng.randint(1, 5), line_items - made)
+        items = []
+        for _ in range(n):
+            p = rng.randrange(products)
+            items.append({"product_id": p, "title": f"Product {p}", "quantity": rng.randint(1, 4), "price": prices[p]})
+        total = sum(li["quantity"] * float(li["price"]) for li in items)
+        orders.append({"id": oid, "created_at": "2024-07-01T00:00:00Z", "total_price": f"{total:.2f}", "line_items": items})
+        made += n
+        oid += 1
+    return orders
+
+
+def to_pages(orders: list[dict]) -> list[bytes]:
+    return [json.dumps({"orders": orders[i:i + PAGE_SIZE]}).encode() for i in range(0, len(orders), PAGE_SIZE)]
+
+
+def summarize(engine, pages: list[bytes]) -> dict:
+    summary = engine()
+    for body in pages:
+        summary.add_page(body)
+    return summary.result()
+
+
+def loads_only(pages: list[bytes]) -> None:
+    for body in pages:
+        loads(body)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(engine, pages: list[bytes], repeat: int) -> tuple[dict, float, int]:
+    seconds = best_of(lambda: summarize(engine, pages), repeat)
+    tracemalloc.start()
+    result = summarize(engine, pages)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+
+    report = {"numpy": np.__version__ if np is not None else None, "products": args.products, "runs": []}
+    for size in args.sizes:
+        orders = synthetic_orders(size, args.products)
+        pages = to_pages(orders)
+        del orders
+
+        results, entry = {}, {"line_items": size, "pages": len(pages)}
+        entry["loads_ms"] = round(best_of(lambda: loads_only(pages), args.repeat) * 1e3, 2)
+        for name, engine in ENGINES.items():
+            result, seconds, peak = run(engine, pages, args.repeat)
+            results[name] = result
+            entry[name] = {"ms": round(seconds * 1e3, 2), "peak_kib": round(peak / 1024, 1)}
+        entry["speedup"] = round(entry["dict"]["ms"] / entry["columnar"]["ms"], 2)
+        entry["same_output"] = results["dict"] == results["columnar"]
+        report["runs"].append(entry)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+from bisect import bisect_left
+from datetime import datetime, timezone
+import asyncio, re, time
+
+from incremental_sync import IncrementalSync
+from shopify_client import ShopifyClient
+
+PRODUCT_FIELDS = "id,title,updated_at,image,images,variants"
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokens(text: str) -> list[str]:
+    return TOKEN.findall(text.lower())
+
+
+# ---------- Product records ----------
+class Product:
+    """The projection /products_simple serves: id, title, first variant price, one image URL."""
+
+    __slots__ = ("id", "title", "price", "image", "updated_at")
+
+    def __init__(self, id: int, title: str, price: str | None, image: str | None, updated_at: str | None):
+        self.id = id
+        self.title = title
+        self.price = price
+        self.image = image
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_json(cls, p: dict) -> "Product":
+        price = (p.get("variants") or [{}])[0].get("price")
+        img = None
+        if p.get("image") and p["image"].get("src"):
+            img = p["image"]["src"]
+        elif (p.get("images") or [{}])[0].get("src"):
+            img = p["images"][0]["src"]
+        return cls(int(p["id"]), p.get("title") or "", price, img, p.get("updated_at"))
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "price": self.price, "image": self.image}
+
+
+class ProductIndex:
+    """
+    Title tokens -> product ids. Every query token must match the start of
+    some title token ("can tot" finds "Canvas Tote"); prefixes are resolved
+    by bisecting a sorted token list.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, set[int]] = {}
+        self._sorted: list[str] | None = []
+
+    def add(self, pid: int, title: str) -> None:
+        for tok in set(tokens(title)):
+            ids = self._postings.get(tok)
+            if ids is None:
+                ids = self._postings[tok] = set()
+                self._sorted = None
+            ids.add(pid)
+
+    def remove(self, pid: int, title: str) -> None:
+        for tok in set(tokens(title)):
+            ids = self._postings.get(tok)
+            if ids is not None:
+                ids.discard(pid)
+                if not ids:
+                    del self._postings[tok]
+                    self._sorted = None
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def _prefixed(self, prefix: str) -> set[int]:
+        if self._sorted is None:
+            self._sorted = sorted(self._postings)
+        out: set[int] = set()
+        i = bisect_left(self._sorted, prefix)
+        while i < len(self._sorted) and self._sorted[i].startswith(prefix):
+            out |= self._postings[self._sorted[i]]
+            i += 1
+        return out
+
+    def search(self, query: str) -> set[int]:
+        found: set[int] | None = None
+        for tok in sorted(set(tokens(query)), key=len, reverse=True):    # longest (rarest) first
+            ids = self._prefixed(tok)     # includes the exact token
+            found = ids if found is None else found & ids
+            if not found:
+                return set()
+        return found or set()
+
+
+# ---------- Catalog mirror ----------
+class ProductCatalog(IncrementalSync):
+    """
+    In-memory mirror of the shop's products, kept as compact Product records
+    with a search index. `sync_once()` reloads everything every
+    `full_interval` seconds (which also drops deleted products) and otherwise
+    only fetches products updated since the last sync; product webhooks
+    apply changes in between.
+    """
+
+    resource = "products.json"
+    label = "product catalog sync"
+
+    def __init__(self, client: ShopifyClient, interval: float = 300.0, full_interval: float = 3600.0,
+                 overlap: float = 60.0):
+        super().__init__(client, interval, overlap)
+        self.full_interval = full_interval
+        self.products: dict[int, Product] = {}
+        self.names: dict[int, str] = {}     # product id -> current title, for joining line items
+        self.index = ProductIndex()
+        self.version = 0                # bumped on every change
+        self.modified_at = datetime.now(timezone.utc)      # when `version` last changed
+        self._hwm: str | None = None
+        self._full_at = 0.0             # monotonic time of the last full load
+        self._ordered: list[Product] | None = None
+        self._seen: set[int] | None = None     # ids paged by the running full load
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.last_sync is not None
+
+    # --- writes ---
+    def _changed(self) -> None:
+        self.version += 1
+        self.modified_at = datetime.now(timezone.utc)
+
+    def upsert(self, p: dict) -> Product:
+        product = Product.from_json(p)
+        old = self.products.get(product.id)
+        if old is not None and (old.title, old.price, old.image) == (product.title, product.price, product.image):
+            return old      # unchanged (e.g. a full reload): keep the version, and so clients' ETags
+        if old is not None:
+            self.index.remove(old.id, old.title)
+        self._ordered = None
+        self.products[product.id] = product
+        self.names[product.id] = product.title
+        self.index.add(product.id, product.title)
+        self._changed()
+        return product
+
+    def remove(self, pid: int) -> None:
+        old = self.products.pop(pid, None)
+        if old is not None:
+            self.index.remove(pid, old.title)
+            self.names.pop(pid, None)
+            self._ordered = None
+            self._changed()
+
+    async def apply(self, page: list[dict]) -> None:
+        for p in page:
+            self.upsert(p)
+            if self._seen is not None:
+                self._seen.add(int(p["id"]))
+
+    async def sync_once(self) -> None:
+        async with self._lock:
+            await self._sync()
+
+    async def _sync(self) -> None:
+        started = datetime.now(timezone.utc)
+        params = {"fields": PRODUCT_FIELDS, "limit": 250}
+        if self._hwm is None or time.monotonic() - self._full_at >= self.full_interval:
+            before, self._seen = set(self.products), set()
+            try:
+                await self.pull(params)
+                seen = self._seen
+            finally:
+                self._seen = None
+            # only products we held before the load can have been deleted; a products/create
+            # webhook landing mid-load is newer than the pages that missed it
+            for pid in before - seen:
+                self.remove(pid)
+            self._full_at = time.monotonic()
+            # anything updated while the full load ran is picked up next round
+            self._hwm = started.isoformat()
+        else:
+            self._hwm = await self.pull_since(params, self._hwm)
+        self.last_sync = started
+
+    # --- reads ---
+    def first(self, limit: int) -> list[Product]:
+        # products.json's default order: by id
+        if self._ordered is None:
+            self._ordered = [self.products[pid] for pid in sorted(self.products)]
+        return self._ordered[:limit]
+
+    def search(self, query: str, limit: int = 10) -> list[Product]:
+        """Products whose title matches every query token as a prefix; title-prefix matches first."""
+        q = query.strip().lower()
+        hits = [self.products[pid] for pid in self.index.search(q)]
+        hits.sort(key=lambda p: (not p.title.lower().startswith(q), len(p.title), p.id))
+        return hits[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self.products),
+            "tokens": len(self.index),
+            "version": self.version,
+            "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+        }
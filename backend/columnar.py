@@ -0,0 +1,218 @@
+from array import array
+from collections import Counter
+from itertools import islice
+from typing import Iterable
+
+from orders_model import Order, loads, product_title, to_cents
+
+try:
+    import numpy as np   # optional: vectorized group-by; pure-Python fallback below
+except ImportError:
+    np = None
+
+
+# ---------- Columnar order summaries ----------
+class ColumnarSummary:
+    """
+    Drop-in alternative to analytics.OrderSummary. Orders are flattened a page
+    at a time into small integer columns (interned product key id, quantity,
+    price cents); every CHUNK line items the columns are folded into
+    per-product running totals, vectorized with NumPy when it is installed.
+    Like OrderSummary, memory follows the number of products, not the window.
+
+    `add_page()` goes from a raw orders.json body straight to columns, money
+    strings parsed in bulk, without building compact Orders first.
+    """
+
+    CHUNK = 4096    # line items buffered between folds
+
+    def __init__(self):
+        self.count = 0
+        self._revenue = 0             # cents
+        self._key_ids: dict[int | str, int] = {}
+        self._keys: list[int | str] = []       # product id, or title for custom items
+        self._seen_titles: dict[int, str] = {}
+        # line items not folded yet
+        self._ids = array("i")
+        self._qty = array("i")
+        self._price = array("q")      # cents
+        # per key id, folded so far
+        self._units = np.zeros(0, np.int64) if np is not None else []
+        self._rev = np.zeros(0, np.int64) if np is not None else []
+        # pre-aggregated buckets folded in via merge()
+        self._extra_revenue = 0
+        self._extra_units: Counter = Counter()
+        self._extra_rev: Counter = Counter()
+        self._grouped: tuple[list[int], list[int]] | None = None
+
+    def add(self, o: dict) -> None:
+        self.add_many((o,))
+
+    def add_compact(self, o: Order) -> None:
+        self.add_orders((o,))
+
+    def add_page(self, body: bytes) -> None:
+        """One raw orders.json response body; its dicts are dropped once flattened."""
+        self.add_many(loads(body).get("orders", []))
+
+    def add_many(self, orders: Iterable[dict]) -> None:
+        it = iter(orders)
+        while batch := list(islice(it, self.CHUNK)):
+            items = [li for o in batch for li in (o.get("line_items") or ())]
+            self.count += len(batch)
+            totals = [o.get("total_price") or 0 for o in batch]
+            qty = [li.get("quantity") or 0 for li in items]
+            price = [li.get("price") or 0 for li in items]
+            if np is not None:
+                # string -> number parsing for the whole batch happens in C
+                self._revenue += int(_np_cents(totals).sum())
+                self._qty.frombytes(np.array(qty, dtype=np.int32).tobytes())
+                self._price.frombytes(_np_cents(price).tobytes())
+            else:
+                self._revenue += sum(map(to_cents, totals))
+                self._qty.extend(map(int, qty))
+                self._price.extend(map(to_cents, price))
+            self._intern([li.get("product_id") for li in items], [li.get("title", "Unknown") for li in items])
+
+    def add_orders(self, orders: Iterable[Order]) -> None:
+        """One page of compact orders (see orders_model.parse_orders)."""
+        orders = orders if isinstance(orders, (list, tuple)) else list(orders)
+        items = [li for o in orders for li in o.items]
+        self.count += len(orders)
+        self._revenue += sum([o.total_cents for o in orders])
+        self._qty.extend([li.quantity for li in items])
+        self._price.extend([li.price_cents for li in items])
+        self._intern([li.product_id for li in items], [li.title for li in items])
+
+    def _intern(self, pids: list, titles: list[str]) -> None:
+        # key ids for the line items just buffered; folds once CHUNK are waiting
+        keys = [t if p is None else p for p, t in zip(pids, titles)]
+        self._seen_titles.update((p, t) for p, t in zip(pids, titles) if p is not None)
+        # intern keys in first-seen order (dict.fromkeys keeps order, in C)
+        kid = self._key_ids
+        for k in dict.fromkeys(keys):
+            if k not in kid:
+                kid[k] = len(self._keys)
+                self._keys.append(k)
+        self._ids.extend(map(kid.__getitem__, keys))
+        if len(self._ids) >= self.CHUNK:
+            self._fold()
+        self._grouped = None
+
+    def merge(self, count: int, revenue_cents: int, units: dict, rev_cents: dict,
+              titles: dict[int, str] | None = None) -> None:
+        self.count += count
+        self._extra_revenue += revenue_cents
+        self._extra_units.update(units)
+        self._extra_rev.update(rev_cents)
+        if titles:
+            self._seen_titles.update(titles)
+        self._grouped = None
+
+    def _fold(self) -> None:
+        """Add the buffered line items to the per-key totals and empty the buffer."""
+        if not len(self._ids):
+            return
+        n = len(self._keys)
+        if np is not None:
+            ids = np.frombuffer(self._ids, dtype=np.int32)
+            qty = np.frombuffer(self._qty, dtype=np.int32).astype(np.int64)
+            price = np.frombuffer(self._price, dtype=np.int64)
+            if len(self._units) < n:
+                grow = np.zeros(n - len(self._units), np.int64)
+                self._units = np.concatenate([self._units, grow])
+                self._rev = np.concatenate([self._rev, grow])
+            # bincount weights are float64: exact for per-chunk sums below 2**53 cents
+            self._units += np.bincount(ids, weights=qty, minlength=n).astype(np.int64)
+            self._rev += np.bincount(ids, weights=qty * price, minlength=n).astype(np.int64)
+        else:
+            units, rev = self._units, self._rev
+            units.extend([0] * (n - len(units)))
+            rev.extend([0] * (n - len(rev)))
+            for tid, q, p in zip(self._ids, self._qty, self._price):
+                units[tid] += q
+                rev[tid] += q * p
+        self._ids = array("i")
+        self._qty = array("i")
+        self._price = array("q")
+
+    def _group(self) -> tuple[list[int], list[int]]:
+        """Per-product (units, revenue cents), indexed by interned key id."""
+        if self._grouped is None:
+            self._fold()
+            if np is not None:
+                self._grouped = (self._units.tolist(), self._rev.tolist())
+            else:
+                self._grouped = (list(self._units), list(self._rev))
+        return self._grouped
+
+    @property
+    def revenue_cents(self) -> int:
+        return self._revenue + self._extra_revenue
+
+    @property
+    def revenue(self) -> float:
+        return self.revenue_cents / 100
+
+    @property
+    def units(self) -> Counter:
+        units, _ = self._group()
+        out = Counter(dict(zip(self._keys, units)))
+        out.update(self._extra_units)
+        return out
+
+    @property
+    def rev_cents(self) -> Counter:
+        _, rev = self._group()
+        out = Counter(dict(zip(self._keys, rev)))
+        out.update(self._extra_rev)
+        return out
+
+    @property
+    def titles(self) -> dict[int, str]:
+        return self._seen_titles
+
+    @property
+    def rev_by_title(self) -> Counter:
+        out = Counter()
+        for k, c in self.rev_cents.items():
+            out[product_title(k, None, self.titles)] += c / 100
+        return out
+
+    def _top(self, top_n: int) -> list[tuple[int | str, int, float]]:
+        units, rev = self._group()
+        if np is not None and not self._extra_units:
+            # stable sort keeps first-seen order on ties, like Counter.most_common
+            order = np.argsort(-np.asarray(units), kind="stable")[:top_n].tolist()
+            return [(self._keys[i], units[i], rev[i]) for i in order]
+        units_c, rev_c = self.units, self.rev_cents
+        return [(k, q, rev_c[k]) for k, q in units_c.most_common(top_n)]
+
+    def result(self, top_n: int = 3, names: dict[int, str] | None = None) -> dict:
+        revenue_cents = self.revenue_cents
+        aov = (revenue_cents / self.count / 100) if self.count else 0.0
+        top = []
+        for key, qty, rev in self._top(top_n):
+            top.append({
+                "product_id": None if isinstance(key, str) else key,
+                "title": product_title(key, names, self.titles),
+                "units": qty,
+                "revenue": rev / 100,
+            })
+        return {
+            "orders_count": self.count,
+            "revenue": revenue_cents / 100,
+            "aov": round(aov, 2),
+            "top_products": top,
+        }
+
+
+def _np_cents(values: list):
+    # money strings have at most 2 decimals, so rint(x * 100) is exact
+    return np.rint(np.array(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def summarize_columnar(orders: Iterable[dict], top_n: int = 3) -> dict:
+    summary = ColumnarSummary()
+    summary.add_many(orders)
+    return summary.result(top_n)
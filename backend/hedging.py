@@ -0,0 +1,70 @@
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, TypeVar
+import asyncio, time
+
+T = TypeVar("T")
+
+# monotonic time by which the current request should have its answer; None = no budget
+request_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+def time_left(cap: float) -> float:
+    """Seconds a call may take: `cap`, or less if the request's deadline comes first."""
+    deadline = request_deadline.get()
+    return cap if deadline is None else min(cap, deadline - time.monotonic())
+
+
+# ---------- Latency tracking ----------
+class LatencyWindow:
+    """The last `size` latencies of one kind of call; percentiles fall back to `default` until `min_samples` are in."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20, default: float = 1.0):
+        self.min_samples = min_samples
+        self.default = default
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float:
+        if len(self._samples) < self.min_samples:
+            return self.default
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+# ---------- Hedged calls ----------
+async def hedged(call: Callable[[], Awaitable[T]], delay: float, timeout: float) -> tuple[T, int, int]:
+    """
+    Await `call()`; if it has not succeeded after `delay` seconds (or failed
+    before that), start a second, identical attempt and take whichever
+    succeeds first, cancelling the other. Returns (result, winning attempt,
+    attempts started). Raises asyncio.TimeoutError once `timeout` passes.
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    first = asyncio.create_task(call())
+    attempts = {first: 1}
+    try:
+        await asyncio.wait({first}, timeout=max(0.0, min(delay, timeout)))
+        if first.done() and first.exception() is None:
+            return first.result(), 1, 1
+        if loop.time() < end:
+            attempts[asyncio.create_task(call())] = 2
+        error: BaseException | None = first.exception() if first.done() else None
+        pending = {t for t in attempts if not t.done()}
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, end - loop.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), attempts[task], len(attempts)
+                error = task.exception()
+        raise error or asyncio.TimeoutError()
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+import gzip, hashlib, json, os
+
+try:
+    import orjson   # optional: several times faster than json.dumps, emits bytes directly
+except ImportError:
+    orjson = None
+
+try:
+    import brotli   # optional: smaller JSON than gzip; only offered when installed
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS = 1024     # smaller bodies aren't worth the CPU or the header
+CODINGS = ("gzip", "br")
+BOOT = os.urandom(4).hex()  # data versions restart at 0 with the process; ETags must not repeat across restarts
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def etag_for(tag) -> str:
+    """Strong ETag from a data version key (any repr-able value) or from body bytes."""
+    raw = tag if isinstance(tag, bytes) else f"{BOOT}:{tag!r}".encode()
+    return '"' + hashlib.blake2b(raw, digest_size=12).hexdigest() + '"'
+
+
+def coded_etag(etag: str, encoding: str | None) -> str:
+    # each content coding is its own representation and needs its own strong tag: '"t"' -> '"t-gzip"'
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def _base_etag(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/")
+    for encoding in CODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def http_date(dt: datetime) -> str:
+    return format_datetime(dt.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    out = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            out.add(name.strip())
+    return out
+
+
+# ---------- Response snapshots ----------
+class Snapshot:
+    """
+    One serialized JSON body plus its validators. Compressed variants are
+    built on first request and kept, so a snapshot reused across polls is
+    serialized and compressed once.
+    """
+
+    __slots__ = ("body", "etag", "last_modified", "_encoded")
+
+    def __init__(self, body: bytes, etag: str, last_modified: datetime | None = None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self._encoded: dict[str, bytes] = {}
+
+    def encoding(self, accept_encoding: str) -> str | None:
+        if len(self.body) < MIN_COMPRESS:
+            return None
+        accepted = _accepted(accept_encoding)
+        if brotli is not None and "br" in accepted:
+            return "br"
+        return "gzip" if "gzip" in accepted else None
+
+    def encoded(self, accept_encoding: str) -> tuple[bytes, str | None]:
+        encoding = self.encoding(accept_encoding)
+        if encoding is None:
+            return self.body, None
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = (
+                brotli.compress(self.body, quality=5) if encoding == "br" else gzip.compress(self.body, 6, mtime=0)
+            )
+        return data, encoding
+
+
+def validator_headers(etag: str, last_modified: datetime | None) -> dict[str, str]:
+    # no-cache: browsers may keep the body but must revalidate, which is exactly the cheap 304 path
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def matched_etag(request: Request, etag: str) -> str | None:
+    """The If-None-Match tag for any coding of `etag` (the variant the client holds), or None."""
+    for tag in (request.headers.get("if-none-match") or "").split(","):
+        if tag.strip() == "*":
+            return etag
+        if _base_etag(tag) == etag:
+            return tag.strip().removeprefix("W/")
+    return None
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """
+    RFC 9110 precedence: If-None-Match decides when present, else If-Modified-Since.
+    `etag` is the uncoded tag; If-None-Match compares weakly, so any coding of it matches.
+    """
+    if request.headers.get("if-none-match") is not None:
+        return matched_etag(request, etag) is not None
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(etag: str, last_modified: datetime | None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def snapshot_response(request: Request, snap: Snapshot) -> Response:
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if not_modified(request, snap.etag, snap.last_modified):
+        # the 304 carries the tag a 200 would have: that of the coding this request negotiates
+        return not_modified_response(coded_etag(snap.etag, snap.encoding(accept_encoding)), snap.last_modified)
+    body, encoding = snap.encoded(accept_encoding)
+    headers = validator_headers(coded_etag(snap.etag, encoding), snap.last_modified)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone, timedelta
+import asyncio, logging
+
+from orders_model import to_epoch
+from shopify_client import BACKGROUND, ShopifyClient, use_priority
+
+log = logging.getLogger(__name__)
+
+
+# ---------- Incremental sync ----------
+class IncrementalSync:
+    """
+    Shared loop for local mirrors kept fresh by polling a Shopify list
+    endpoint with updated_at_min: pages go to `apply()`, the newest
+    updated_at seen moves the high-water mark, and `run()` repeats
+    `sync_once()` every `interval` seconds at background priority.
+    Subclasses set `resource` and implement `apply()` and `sync_once()`.
+    """
+
+    resource = ""           # list endpoint, e.g. "orders.json"
+    label = "sync"          # for log messages
+
+    def __init__(self, client: ShopifyClient, interval: float, overlap: float = 60.0):
+        self.client = client
+        self.interval = interval
+        self.overlap = overlap          # re-read a little behind the mark to absorb clock skew
+        self.last_sync: datetime | None = None
+
+    async def apply(self, page: list[dict]) -> None:
+        raise NotImplementedError
+
+    async def sync_once(self) -> None:
+        raise NotImplementedError
+
+    async def pull(self, params: dict) -> str | None:
+        """Page `resource` into apply(); returns the newest updated_at seen, if any."""
+        newest = None
+        async for page in self.client.paginate(self.resource, params=params):
+            await self.apply(page)
+            for r in page:
+                if r.get("updated_at") and (newest is None or to_epoch(r["updated_at"]) > to_epoch(newest)):
+                    newest = r["updated_at"]
+        return newest
+
+    async def pull_since(self, params: dict, hwm: str) -> str:
+        """Fetch what changed since just before `hwm`; returns the advanced mark."""
+        since = datetime.fromisoformat(hwm) - timedelta(seconds=self.overlap)
+        newest = await self.pull({**params, "updated_at_min": since.isoformat()})
+        if newest is not None and to_epoch(newest) > to_epoch(hwm):
+            return datetime.fromtimestamp(to_epoch(newest), timezone.utc).isoformat()
+        return hwm
+
+    async def run(self) -> None:
+        with use_priority(BACKGROUND):
+            while True:
+                try:
+                    await self.sync_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("%s failed: %s", self.label, e)
+                await asyncio.sleep(self.interval)
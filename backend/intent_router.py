@@ -0,0 +1,166 @@
+from collections import Counter
+from dataclasses import dataclass
+import math, re
+
+INTENTS = ("sales_overview", "orders_today", "top_selling")
+DEFAULT_RANGE = {"sales_overview": 7, "orders_today": 1, "top_selling": 30}
+
+# ---------- Tier 1a: keyword/regex rules ----------
+INTENT_RULES: list[tuple[str, re.Pattern]] = [
+    ("top_selling", re.compile(
+        r"\b(top|best)[\s-]*(sell\w*|products?|items?|performers?)\b|\bmost (popular|sold|ordered)\b|\bbestsellers?\b"
+        r"|\bwhat('s| is| are)? selling\b|\bsell(s|ing)? (the )?(most|best)\b"
+    )),
+    ("orders_today", re.compile(
+        r"\b(orders?|purchases?|sold)\b.*\btoday\b|\btoday\b.*\b(orders?|purchases?)\b|\bhow many orders\b(?!.*\b(week|month)\b)"
+    )),
+    ("sales_overview", re.compile(
+        r"\b(sales|revenue|performance|perform\w*|doing|trend\w*|aov|average order|income|earn\w*|money|numbers|summary|overview)\b"
+    )),
+]
+
+RANGE_RULES: list[tuple[int, re.Pattern]] = [
+    (1, re.compile(r"\b(today|tonight|this morning|so far today|yesterday|24\s?h\w*|1\s?d(ay)?|last day|daily)\b")),
+    (7, re.compile(r"\b(week\w*|7\s?d(ays?)?|seven days|wow|weekly)\b")),
+    (30, re.compile(r"\b(month\w*|30\s?d(ays?)?|thirty days|mtd|mom|monthly)\b")),
+]
+
+# Compound questions: "orders today and top sellers this month?"
+CLAUSE_SPLIT = re.compile(r"\s*(?:[,;&]|\band also\b|\bas well as\b|\bplus\b|\band\b)\s*")
+MAX_TASKS = 3
+
+# ---------- Tier 1b: tiny bag-of-words centroid model ----------
+# Seed phrasings per intent; centroids are built once at import.
+SEED_QUESTIONS = {
+    "sales_overview": [
+        "how are sales doing", "how is the store performing", "what is my revenue",
+        "give me a sales summary", "how much money did we make", "are sales up or down",
+        "what is the average order value", "how did we do compared to last period",
+        "show me store performance", "revenue trend",
+    ],
+    "orders_today": [
+        "orders today", "how many orders today", "did we get any orders today",
+        "any new orders", "how many purchases so far", "number of orders today",
+        "what came in today", "how busy is the shop today",
+    ],
+    "top_selling": [
+        "top sellers", "best selling products", "what is selling the most",
+        "most popular items", "which product sold the most", "top products by units",
+        "best performers", "what are customers buying most",
+    ],
+}
+
+STOPWORDS = frozenset("a an the is are was were my our me we i of to for in on at do did does how what any".split())
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _vector(text: str) -> dict[str, float]:
+    toks = [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+    feats = Counter(toks)
+    feats.update(f"{a}_{b}" for a, b in zip(toks, toks[1:]))
+    norm = math.sqrt(sum(v * v for v in feats.values())) or 1.0
+    return {k: v / norm for k, v in feats.items()}
+
+
+def _centroid(texts: list[str]) -> dict[str, float]:
+    total: Counter = Counter()
+    for t in texts:
+        total.update(_vector(t))
+    norm = math.sqrt(sum(v * v for v in total.values())) or 1.0
+    return {k: v / norm for k, v in total.items()}
+
+
+CENTROIDS = {intent: _centroid(qs) for intent, qs in SEED_QUESTIONS.items()}
+
+
+def _cosine(vec: dict[str, float], centroid: dict[str, float]) -> float:
+    return sum(w * centroid.get(k, 0.0) for k, w in vec.items())
+
+
+# ---------- Router ----------
+@dataclass
+class Route:
+    intent: str
+    range_days: int
+    confidence: float
+    source: str             # "local" or "llm"
+
+    def as_choice(self) -> dict:
+        return {"intent": self.intent, "range_days": self.range_days}
+
+
+def classify_local(q: str) -> Route:
+    """Rules + centroid model; returns in microseconds with a 0..1 confidence."""
+    ql = q.lower()
+    rule_intent = next((intent for intent, rx in INTENT_RULES if rx.search(ql)), None)
+
+    vec = _vector(ql)
+    scores = sorted(((_cosine(vec, c), intent) for intent, c in CENTROIDS.items()), reverse=True)
+    (best, vec_intent), (second, _) = scores[0], scores[1]
+
+    if rule_intent and rule_intent == vec_intent:
+        intent, confidence = rule_intent, 0.95
+    elif rule_intent:
+        intent, confidence = rule_intent, 0.8
+    else:
+        # no rule fired: trust the centroid only as far as it separates the intents
+        intent = vec_intent if best > 0 else "sales_overview"
+        confidence = round(min(0.6, best * 0.5 + (best - second)), 3)
+
+    range_days = next((days for days, rx in RANGE_RULES if rx.search(ql)), None)
+    if intent == "orders_today":
+        range_days = 1
+    elif range_days is None:
+        range_days = DEFAULT_RANGE[intent]
+    return Route(intent, range_days, confidence, "local")
+
+
+def classify_local_tasks(q: str) -> list[Route]:
+    """
+    One Route per clause that names an intent, so compound questions become
+    several tasks; anything else (or a single distinct task) is one Route
+    for the whole question.
+    """
+    ql = q.lower()
+    clauses = [c for c in CLAUSE_SPLIT.split(ql) if c.strip()]
+    if len(clauses) > 1:
+        routes: dict[tuple[str, int], Route] = {}
+        for clause in clauses:
+            if any(rx.search(clause) for _, rx in INTENT_RULES):
+                route = classify_local(clause)
+                routes.setdefault((route.intent, route.range_days), route)
+        if len(routes) > 1:
+            return list(routes.values())[:MAX_TASKS]
+    return [classify_local(q)]
+
+
+class IntentRouter:
+    """
+    Tiered intent classification: the local classifier answers when it is
+    at least `threshold` confident about every task in the question,
+    otherwise the LLM decides. Counts how often each tier answered.
+    """
+
+    def __init__(self, threshold: float = 0.75):
+        self.threshold = threshold
+        self.local_hits = 0
+        self.llm_calls = 0
+
+    def try_local(self, q: str) -> list[Route] | None:
+        routes = classify_local_tasks(q)
+        if min(r.confidence for r in routes) >= self.threshold:
+            self.local_hits += 1
+            return routes
+        return None
+
+    def record_llm(self) -> None:
+        self.llm_calls += 1
+
+    def stats(self) -> dict:
+        total = self.local_hits + self.llm_calls
+        return {
+            "threshold": self.threshold,
+            "local_hits": self.local_hits,
+            "llm_calls": self.llm_calls,
+            "local_hit_rate": round(self.local_hits / total, 3) if total else None,
+        }
@@ -1,72 +1,306 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from openai import OpenAI
-from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-from zoneinfo import ZoneInfo  # pip install tzdata if needed
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Iterator
 from pathlib import Path
-import os, requests, json
+import os, re, json, hashlib, logging, asyncio, threading, time
+
+from shopify_client import INTERACTIVE, ShopifyClient, request_priority
+from shopify_bulk import BulkOrderExporter
+from shop_meta import ShopMetaCache
+from order_store import OrderStore, OrderSync
+from warmup import FactsWarmer
+from catalog import Product, ProductCatalog
+from tenants import SHOP_HEADER, FairGate, Tenant, TenantRegistry, current_tenant, load_credentials, normalize_shop
+from analytics import OrderSummary
+from orders_model import Order, parse_orders, to_epoch
+from webhooks import ORDER_TOPICS, PRODUCT_TOPICS, verify_webhook
+from shop_auth import verify_session_token, verify_signed_query
+from cache import TTLCache
+from http_cache import Snapshot, dumps, etag_for, matched_etag, not_modified, not_modified_response, snapshot_response
+from metrics import METRICS, labelled, request_timings, server_timing
+from singleflight import SingleFlight
+from intent_router import MAX_TASKS, IntentRouter, classify_local_tasks
+from hedging import LatencyWindow, hedged, request_deadline, time_left
+
+if TYPE_CHECKING:
+    from columnar import ColumnarSummary    # pulls in NumPy; only imported when SUMMARY_ENGINE=columnar
+
+log = logging.getLogger(__name__)
 
 # ---------- ENV ----------
 ENV_PATH = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=ENV_PATH)
+if ENV_PATH.exists():
+    # containers get their settings from the environment; only local runs need python-dotenv
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=ENV_PATH)
+
+# Shopify ENV
+STORE_DOMAIN = os.getenv("SHOPIFY_STORE_DOMAIN")                 # e.g. "your-store.myshopify.com"; the default tenant
+ACCESS_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
+TENANTS_FILE = os.getenv("SHOPIFY_TENANTS_FILE")                 # JSON {shop domain: access token} for more shops
+# other shops' data is only served to requests that prove the shop: an App Bridge session token or a signed query
+API_KEY = os.getenv("SHOPIFY_API_KEY")                           # session token audience, checked when set
+API_SECRET = os.getenv("SHOPIFY_API_SECRET")                     # signs session tokens and launch URLs
+SIGNED_QUERY_MAX_AGE = float(os.getenv("SHOPIFY_SIGNED_QUERY_MAX_AGE", "3600"))  # seconds a signed ?shop=&hmac= URL stays valid
+API_VERSION = os.getenv("SHOPIFY_API_VERSION", "2024-07")        # configurable, sensible default
+POOL_SIZE = int(os.getenv("SHOPIFY_POOL_SIZE", "20"))            # max open connections to the store
+KEEPALIVE = int(os.getenv("SHOPIFY_KEEPALIVE", "10"))            # idle connections kept warm
+HTTP2 = os.getenv("SHOPIFY_HTTP2", "1") == "1"
+LEAK_RATE = float(os.getenv("SHOPIFY_LEAK_RATE", "2"))           # REST bucket drain, calls/sec (Plus: 20)
+FETCH_PARALLELISM = int(os.getenv("SHOPIFY_FETCH_PARALLELISM", "4"))  # concurrent order-window slices
+FETCH_SLOTS = int(os.getenv("SHOPIFY_FETCH_SLOTS", str(FETCH_PARALLELISM)))  # per shop, next to its own leaky bucket
+FETCH_HEADROOM = int(os.getenv("SHOPIFY_FETCH_HEADROOM", "1"))  # of those, slots background work never takes
+FETCH_SLOTS_TOTAL = int(os.getenv("SHOPIFY_FETCH_SLOTS_TOTAL", "256"))  # process-wide safety cap, shared fairly by shops
+SUMMARY_ENGINE = os.getenv("SUMMARY_ENGINE", "dict")             # "dict" or "columnar" (NumPy if installed)
+SHOP_META_TTL = float(os.getenv("SHOP_META_TTL", "3600"))        # seconds to trust cached shop.json
+SHOPIFY_API_BASE = os.getenv("SHOPIFY_API_BASE")                 # override origin, e.g. a local fake Shopify
+ORDERS_BACKEND = os.getenv("SHOPIFY_ORDERS_BACKEND", "rest")     # "rest" or "bulk" (GraphQL bulk operations)
+BULK_MIN_DAYS = float(os.getenv("SHOPIFY_BULK_MIN_DAYS", "30"))  # windows at least this long go through bulk
+BULK_POLL_INTERVAL = float(os.getenv("SHOPIFY_BULK_POLL_INTERVAL", "1"))  # first status poll, backs off to 10s
+
+# Local order store (disabled unless a path is set)
+ORDER_STORE_PATH = os.getenv("ORDER_STORE_PATH")                 # e.g. "orders.sqlite3", or "orders-{shop}.sqlite3" per shop
+ORDER_SYNC_INTERVAL = float(os.getenv("ORDER_SYNC_INTERVAL", "60"))
+ORDER_BACKFILL_DAYS = int(os.getenv("ORDER_BACKFILL_DAYS", "90"))  # history pulled on first start
+WEBHOOK_SECRET = os.getenv("SHOPIFY_WEBHOOK_SECRET") or os.getenv("SHOPIFY_API_SECRET")
+
+# Product catalog mirror
+PRODUCT_CATALOG = os.getenv("PRODUCT_CATALOG", "1") == "1"        # serve /products_simple from memory
+PRODUCT_SYNC_INTERVAL = float(os.getenv("PRODUCT_SYNC_INTERVAL", "300"))      # updated_at_min refresh
+PRODUCT_FULL_SYNC_INTERVAL = float(os.getenv("PRODUCT_FULL_SYNC_INTERVAL", "3600"))  # full reload; drops deleted products
+
+# OpenAI ENV
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_PRELOAD = os.getenv("OPENAI_PRELOAD", "1") == "1"         # import/build the client in the background at startup
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", "8"))            # seconds per chat request, facts + LLM; 0 = no budget
+LLM_CLASSIFY_TIMEOUT = float(os.getenv("LLM_CLASSIFY_TIMEOUT", "3"))   # cap per classification (both attempts)
+LLM_ANSWER_TIMEOUT = float(os.getenv("LLM_ANSWER_TIMEOUT", "6"))       # cap per answer (to the first token when streaming)
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # hedge classifications slower than this
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "1.0"))     # hedge delay until enough latencies are recorded
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "300"))   # seconds
+INTENT_LOCAL_THRESHOLD = float(os.getenv("INTENT_LOCAL_THRESHOLD", "0.75"))  # below this, ask the LLM
+# precompute chat facts this often; 0 = off. On by default only with an order store, where a refresh
+# reads rollups; without one it would page 60 days of orders from Shopify every few minutes
+FACTS_WARM_INTERVAL = float(os.getenv("FACTS_WARM_INTERVAL", "300" if ORDER_STORE_PATH else "0"))
+FACTS_MAX_AGE = float(os.getenv("FACTS_MAX_AGE", "900"))         # older precomputed facts are recomputed on demand
+
+# Dashboard responses
+SNAPSHOT_CACHE_SIZE = int(os.getenv("SNAPSHOT_CACHE_SIZE", "256"))   # serialized bodies kept per data version
+ROLLING_WINDOW_STEP = int(os.getenv("ROLLING_WINDOW_STEP", "60"))   # seconds a rolling window's ETag stays valid
+
+# Observability
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"           # per-stage breakdown in a Server-Timing header
+
+def make_tenant(domain: str | None, access_token: str | None) -> Tenant:
+    # one pooled client per shop, so each shop also gets its own leaky bucket
+    client = ShopifyClient(
+        domain, access_token, API_VERSION,
+        pool_size=POOL_SIZE, keepalive=KEEPALIVE, http2=HTTP2, leak_rate=LEAK_RATE, api_base=SHOPIFY_API_BASE,
+    )
+    meta = ShopMetaCache(client, ttl=SHOP_META_TTL)
+    path = order_store_path(domain)
+    store = OrderStore(path) if path else None
+    sync = (
+        OrderSync(client, store, meta, backfill_days=ORDER_BACKFILL_DAYS, interval=ORDER_SYNC_INTERVAL)
+        if store else None
+    )
+    bulk = BulkOrderExporter(client, poll_interval=BULK_POLL_INTERVAL) if ORDERS_BACKEND == "bulk" else None
+    warmer = (
+        FactsWarmer(chat_facts_uncached, meta.zone, version=(lambda: store.version) if store else None,
+                    ready=(lambda: sync.ready) if sync else None, interval=FACTS_WARM_INTERVAL, max_age=FACTS_MAX_AGE)
+        if FACTS_WARM_INTERVAL > 0 else None
+    )
+    catalog = (
+        ProductCatalog(client, interval=PRODUCT_SYNC_INTERVAL, full_interval=PRODUCT_FULL_SYNC_INTERVAL)
+        if PRODUCT_CATALOG else None
+    )
+    return Tenant(domain, client, meta, order_store=store, order_sync=sync, bulk=bulk, warmer=warmer,
+                  catalog=catalog, fetch_gate=FairGate(FETCH_SLOTS, headroom=FETCH_HEADROOM))
+
+def order_store_path(domain: str | None) -> str | None:
+    if not ORDER_STORE_PATH:
+        return None
+    if "{shop}" in ORDER_STORE_PATH:
+        return ORDER_STORE_PATH.format(shop=domain or "default")
+    # a single file can only hold one shop: the default one
+    return ORDER_STORE_PATH if domain == tenants.default_domain else None
+
+tenants = TenantRegistry(make_tenant, load_credentials(TENANTS_FILE), STORE_DOMAIN, ACCESS_TOKEN)
+fetch_gate = FairGate(FETCH_SLOTS_TOTAL, headroom=FETCH_SLOTS_TOTAL // 4)
+intent_cache = TTLCache(maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)   # normalized question -> intent
+overview_flights = SingleFlight()   # concurrent sales_overview(range_days) calls share one computation
+intent_router = IntentRouter(threshold=INTENT_LOCAL_THRESHOLD)
+answer_cache = TTLCache(maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)   # (intent, range_days, facts hash) -> answer
+snapshots = TTLCache(maxsize=SNAPSHOT_CACHE_SIZE, ttl=3600)   # (shop, route, args, data version) -> Snapshot
+
+def tenant() -> Tenant:
+    """The shop the current request is for (see the tenant middleware); the default shop otherwise."""
+    return current_tenant.get() or tenants.default
+
+
+_oai = None
+_oai_lock = threading.Lock()
+
+def openai_client():
+    """
+    The async OpenAI client, or None without an API key. The `openai` package
+    takes about half a second to import, so it is loaded on first use (or
+    preloaded by the lifespan) rather than when this module is imported.
+    """
+    global _oai
+    if _oai is None and OPENAI_API_KEY:
+        with _oai_lock:     # one import/construction however many threads ask at once
+            if _oai is None:
+                from openai import AsyncOpenAI
+                # no SDK retries: deadlines and hedging decide when to try again
+                _oai = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return _oai
+
+async def load_openai_client():
+    # first use imports `openai` (or waits on a preload holding the lock): do that in a thread, not on the loop
+    if _oai is not None or not OPENAI_API_KEY:
+        return _oai
+    return await asyncio.to_thread(openai_client)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    default = tenants.default
+    preload = None
+    if OPENAI_PRELOAD and OPENAI_API_KEY:
+        # not awaited: routes serve while the import finishes in a worker thread, overlapping the shop warm-up
+        preload = asyncio.create_task(asyncio.to_thread(openai_client))
+    try:
+        await default.shop_meta.warm()      # also opens the first pooled connection to the shop
+    except Exception as e:
+        # not fatal: the first request will fetch it instead
+        log.warning("shop metadata warm-up failed: %s", e)
+    default.start_background()
+    yield
+    if preload is not None and not preload.done():
+        preload.cancel()
+    await tenants.aclose()
+    if _oai is not None:
+        await _oai.close()
+
+
+app = FastAPI(title="Shopify AI Chatbot Backend", lifespan=lifespan)
+
+def request_shop(request: Request) -> str | None:
+    """
+    The shop a request may act for. Webhooks name it in a header and the
+    handler rejects unsigned bodies before touching any data; app requests
+    must prove it with a session token or a signed query. An unproven shop
+    header or ?shop= is only accepted for the default shop; none means the default.
+    """
+    if request.url.path == "/webhooks/shopify":
+        return request.headers.get(SHOP_HEADER)
+    verified = None
+    if API_SECRET:
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            verified = verify_session_token(auth[7:].strip(), API_SECRET, API_KEY)
+            if verified is None:
+                raise HTTPException(status_code=401, detail="Invalid session token")
+        elif "hmac" in request.query_params:
+            verified = verify_signed_query(dict(request.query_params), API_SECRET, SIGNED_QUERY_MAX_AGE)
+            if verified is None:
+                raise HTTPException(status_code=401, detail="Invalid or expired signed query")
+    claimed = request.headers.get(SHOP_HEADER) or request.query_params.get("shop")
+    if verified is not None:
+        if claimed and normalize_shop(claimed) != normalize_shop(verified):
+            raise HTTPException(status_code=401, detail="Shop does not match the verified shop")
+        return verified
+    if claimed and normalize_shop(claimed) != tenants.default_domain:
+        raise HTTPException(status_code=401, detail="Requests for other shops need a session token or signed query")
+    return None
+
+@app.middleware("http")
+async def tenant_context(request: Request, call_next):
+    if request.method == "OPTIONS":
+        return await call_next(request)     # preflights carry no credentials; CORS answers them
+    try:
+        t = tenants.resolve(request_shop(request))
+    except HTTPException as e:
+        return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+    token = current_tenant.set(t)
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
 
-app = FastAPI(title="Shopify AI Chatbot Backend")
+@app.middleware("http")
+async def timing(request: Request, call_next):
+    # every METRICS.span() inside this request also lands in `timings`
+    timings: dict = {}
+    token = request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    METRICS.observe("http_request_duration_seconds", elapsed, route=route.path if route else "unmatched")
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
 
-# Allow your Next dev server
+# Allow your Next dev server. Added last, so it wraps the middlewares above: their
+# error responses (401/404 for the shop) carry CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-# Shopify ENV
-STORE_DOMAIN = os.getenv("SHOPIFY_STORE_DOMAIN")                 # e.g. "your-store.myshopify.com"
-ACCESS_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
-API_VERSION = os.getenv("SHOPIFY_API_VERSION", "2024-07")        # configurable, sensible default
-
-# OpenAI ENV
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-oai = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+METRICS.collect("cache_hits_total", "counter", lambda: labelled(
+    [("intent", intent_cache.hits), ("answer", answer_cache.hits), ("intent_local", intent_router.local_hits)], "cache",
+), help="Lookups answered from an in-process cache (intent_local: the local intent classifier)")
+METRICS.collect("cache_misses_total", "counter", lambda: labelled(
+    [("intent", intent_cache.misses), ("answer", answer_cache.misses)], "cache",
+), help="Lookups that had to compute")
+METRICS.collect("singleflight_shared_total", "counter", lambda: labelled(
+    [("shopify", sum(t.client.flights.shared for t in tenants.active())), ("sales_overview", overview_flights.shared)],
+    "group",
+), help="Callers that joined an identical in-flight call instead of starting their own")
+METRICS.collect("warm_facts_age_seconds", "gauge", lambda: {
+    (("range_days", str(r)), ("shop", str(t.domain))): age
+    for t in tenants.active() if t.warmer
+    for r in t.warmer.ranges if (age := t.warmer.age(r)) is not None
+}, help="Age of the precomputed chat facts, per shop and range")
+METRICS.collect("shopify_bucket_level", "gauge", lambda: labelled(
+    [(t.domain, t.client.scheduler.level) for t in tenants.active()], "shop",
+), help="Last known Shopify REST leaky-bucket fill, per shop")
 
 
 # ---------- Shopify helper ----------
-def shopify_get(path: str, params: dict | None = None):
-    if not STORE_DOMAIN or not ACCESS_TOKEN:
-        raise RuntimeError("Missing SHOPIFY_STORE_DOMAIN or SHOPIFY_ACCESS_TOKEN in .env")
-    url = f"https://{STORE_DOMAIN}/admin/api/{API_VERSION}/{path}"
-    headers = {
-        "X-Shopify-Access-Token": ACCESS_TOKEN,
-        "Content-Type": "application/json",
-    }
-    r = requests.get(url, headers=headers, params=params, timeout=20)
-    if r.status_code >= 400:
-        raise HTTPException(status_code=r.status_code, detail=r.text)
-    return r.json()
+async def shopify_get(path: str, params: dict | None = None):
+    return await tenant().client.get(path, params=params)
 
 
 # ---------- Time & ranges ----------
-def get_shop_timezone() -> str:
-    data = shopify_get("shop.json", params={"fields": "iana_timezone"})
-    tz = (data.get("shop") or {}).get("iana_timezone")
-    if not tz:
-        raise HTTPException(status_code=500, detail="Cannot read shop timezone")
-    return tz
-
-def start_of_today_utc_from_shop_tz() -> str:
-    tzname = get_shop_timezone()
-    tz = ZoneInfo(tzname)
+async def start_of_today_utc_from_shop_tz() -> str:
+    tz = await tenant().shop_meta.zone()
     now_local = datetime.now(tz)
     start_local = datetime(now_local.year, now_local.month, now_local.day, tzinfo=tz)
     return start_local.astimezone(timezone.utc).isoformat()
 
-def range_to_utc(range_days: int) -> tuple[str, str]:
-    tz = ZoneInfo(get_shop_timezone())
-    now_local = datetime.now(tz)
+def utc_now() -> datetime:
+    # whole seconds (Shopify's resolution) so concurrent callers ask for identical windows
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+async def range_to_utc(range_days: int) -> tuple[str, str]:
+    tz = await tenant().shop_meta.zone()
+    now_local = utc_now().astimezone(tz)
     end_local = now_local
     start_local = now_local - timedelta(days=range_days)
     return (
@@ -76,55 +310,165 @@ def range_to_utc(range_days: int) -> tuple[str, str]:
 
 
 # ---------- Analytics helpers ----------
-def fetch_orders_between(start_iso: str, end_iso: str) -> list[dict]:
-    data = shopify_get(
-        "orders.json",
-        params={
-            "status": "any",
-            "created_at_min": start_iso,
-            "created_at_max": end_iso,
-            "fields": "id,created_at,total_price,line_items",
-            "limit": 250,
-        },
-    )
-    return data.get("orders", [])
-
-def summarize_orders(orders: list[dict], top_n: int = 3) -> dict:
-    revenue = sum(float(o.get("total_price") or 0) for o in orders)
-    count = len(orders)
-    aov = (revenue / count) if count else 0.0
-
-    units = Counter()
-    rev_by_title = Counter()
-    for o in orders:
-        for li in (o.get("line_items") or []):
-            title = li.get("title", "Unknown")
-            q = int(li.get("quantity") or 0)
-            price_each = float(li.get("price") or 0)
-            units[title] += q
-            rev_by_title[title] += q * price_each
-
-    top = []
-    for title, qty in units.most_common(top_n):
-        top.append({"title": title, "units": qty, "revenue": round(rev_by_title[title], 2)})
+ORDERS_PAGE_SIZE = 250  # Shopify's max page size for orders.json
 
-    return {
-        "orders_count": count,
-        "revenue": round(revenue, 2),
-        "aov": round(aov, 2),
-        "top_products": top,
+def use_bulk(start_iso: str, end_iso: str | None) -> bool:
+    """Long windows are cheaper as one bulk operation than as hundreds of REST pages."""
+    if tenant().bulk is None:
+        return False
+    start = datetime.fromisoformat(start_iso.replace("Z", "+00:00"))
+    end = datetime.fromisoformat(end_iso.replace("Z", "+00:00")) if end_iso else utc_now()
+    return end - start >= timedelta(days=BULK_MIN_DAYS)
+
+def _orders_params(start_iso: str, end_iso: str | None, fields: str) -> dict:
+    params = {
+        "status": "any",
+        "created_at_min": start_iso,
+        "fields": fields,
+        "limit": ORDERS_PAGE_SIZE,
     }
+    if end_iso:
+        params["created_at_max"] = end_iso
+    return params
+
+@asynccontextmanager
+async def fetch_slot(t: Tenant):
+    # a slice pages under the shop's own limit first, then the process-wide cap (round-robin between shops)
+    async with t.fetch_gate.slot(t.domain), fetch_gate.slot(t.domain):
+        yield
+
+def new_summary() -> "OrderSummary | ColumnarSummary":
+    if SUMMARY_ENGINE == "columnar":
+        from columnar import ColumnarSummary
+        return ColumnarSummary()
+    return OrderSummary()
+
+async def summarize_window(
+    start_iso: str, end_iso: str | None = None, fields: str = "id,created_at,total_price,line_items"
+) -> "OrderSummary | ColumnarSummary":
+    # synced store with rollups: merge day buckets; otherwise stream the orders
+    t = tenant()
+    if t.order_sync and t.order_sync.covers(start_iso) and t.order_store.tz is not None:
+        with METRICS.span("order_store"):
+            return await t.order_store.summarize_between(start_iso, end_iso or utc_now().isoformat())
+
+    # one bulk operation streams the whole window; memory stays flat
+    if use_bulk(start_iso, end_iso):
+        summary = new_summary()
+        async for o in t.bulk.iter_orders(start_iso, end_iso):
+            summary.add(o)
+        return summary
+
+    # cursor pages are sequential, so split long windows into slices paged side by side
+    slices = split_window(start_iso, end_iso or utc_now().isoformat(), FETCH_PARALLELISM)
+    parts = await asyncio.gather(*(_summarize_slice(a, b, fields) for a, b in slices))
+    if len(parts) == 1:
+        return parts[0]
+    summary = OrderSummary()
+    for part in parts:
+        summary.merge(part.count, part.revenue_cents, part.units, part.rev_cents, part.titles)
+    return summary
+
+async def _summarize_slice(start_iso: str, end_iso: str, fields: str) -> "OrderSummary | ColumnarSummary":
+    t = tenant()
+    summary = new_summary()
+    params = _orders_params(start_iso, end_iso, fields)
+    async with fetch_slot(t):
+        # each raw page is summarized as it arrives; its JSON dicts never outlive the page
+        async for body in t.client.paginate_raw("orders.json", params=params):
+            with METRICS.span("summarize"):
+                summary.add_page(body)
+    return summary
+
+async def summarize_windows(windows: list[tuple[str, str]]) -> list[OrderSummary]:
+    """
+    Summaries for several [start, end] windows from one fetch of their union:
+    overlapping windows (today inside the last 7 days inside the last 30) cost
+    the largest span once, and each order is counted into every window it falls in.
+    """
+    t = tenant()
+    span_start = min(a for a, _ in windows)
+    span_end = max(b for _, b in windows)
+    if t.order_sync and t.order_sync.covers(span_start) and t.order_store.tz is not None:
+        # rollups answer any window cheaply; nothing to share
+        return list(await asyncio.gather(*(summarize_window(a, b) for a, b in windows)))
+
+    bounds = [(to_epoch(a), to_epoch(b)) for a, b in windows]
+    summaries = [OrderSummary() for _ in windows]
+
+    def route(o: Order) -> None:
+        for (lo, hi), summary in zip(bounds, summaries):
+            if lo <= o.created_at <= hi:
+                summary.add_compact(o)
+
+    if use_bulk(span_start, span_end):
+        async for o in t.bulk.iter_orders(span_start, span_end):
+            route(Order.from_json(o))
+        return summaries
+
+    async def fetch_slice(a: str, b: str) -> None:
+        params = _orders_params(a, b, "id,created_at,total_price,line_items")
+        async with fetch_slot(t):
+            async for body in t.client.paginate_raw("orders.json", params=params):
+                with METRICS.span("summarize"):
+                    for o in parse_orders(body):
+                        route(o)
+
+    await asyncio.gather(*(fetch_slice(a, b) for a, b in split_window(span_start, span_end, FETCH_PARALLELISM)))
+    return summaries
+
+def split_window(start_iso: str, end_iso: str, parts: int, min_span: timedelta = timedelta(days=1)) -> list[tuple[str, str]]:
+    """
+    Cut [start, end] into up to `parts` non-overlapping slices of at least `min_span`.
+    created_at_max is inclusive and Shopify timestamps are whole seconds, so each
+    slice stops one second before the next one starts.
+    """
+    start = datetime.fromisoformat(start_iso.replace("Z", "+00:00"))
+    end = datetime.fromisoformat(end_iso.replace("Z", "+00:00"))
+    parts = max(1, min(parts, int((end - start) / min_span)))
+    if parts == 1:
+        return [(start_iso, end_iso)]
+    step = (end - start) / parts
+    cuts = [(start + step * i).replace(microsecond=0) for i in range(1, parts)]
+    bounds = [start, *cuts]
+    slices = [(bounds[i].isoformat(), (bounds[i + 1] - timedelta(seconds=1)).isoformat()) for i in range(parts - 1)]
+    slices.append((bounds[-1].isoformat(), end_iso))
+    return slices
+
+async def sales_overview(range_days: int = 7) -> dict:
+    key = (tenant().domain, "sales_overview", range_days)
+    return await overview_flights.do(key, lambda: _sales_overview(range_days))
+
+def overview_windows(range_days: int, cur_start: str, cur_end: str) -> tuple[tuple[str, str], tuple[str, str]]:
+    # previous: same-length window immediately before the current one
+    start = datetime.fromisoformat(cur_start.replace("Z", "+00:00"))
+    return (cur_start, cur_end), ((start - timedelta(days=range_days)).isoformat(), cur_start)
+
+async def _sales_overview(range_days: int) -> dict:
+    cur_window, prev_window = overview_windows(range_days, *await range_to_utc(range_days))
+
+    # one fetch (one bulk operation) over both windows, which are adjacent
+    cur_summary, prev_summary = await summarize_windows([cur_window, prev_window])
+    names = product_names()
+    return overview_result(range_days, cur_summary.result(names=names), prev_summary.result(names=names))
 
-def sales_overview(range_days: int = 7) -> dict:
-    # current
-    cur_start, cur_end = range_to_utc(range_days)
-    cur = summarize_orders(fetch_orders_between(cur_start, cur_end))
+async def sales_overviews(ranges: list[int]) -> dict[int, dict]:
+    """sales_overview for several ranges at once, from one fetch of the longest span."""
+    now = utc_now()
+    windows = [w for r in ranges for w in overview_windows(r, (now - timedelta(days=r)).isoformat(), now.isoformat())]
+    summaries = await summarize_windows(windows)
+    names = product_names()
+    return {
+        r: overview_result(r, summaries[2 * i].result(names=names), summaries[2 * i + 1].result(names=names))
+        for i, r in enumerate(ranges)
+    }
 
-    # previous: same-length window immediately before
-    prev_start_dt = datetime.fromisoformat(cur_start.replace("Z", "+00:00")) - timedelta(days=range_days)
-    prev_end_dt = datetime.fromisoformat(cur_start.replace("Z", "+00:00"))
-    prev = summarize_orders(fetch_orders_between(prev_start_dt.isoformat(), prev_end_dt.isoformat()))
+def product_names() -> dict[int, str] | None:
+    # current titles for top products, once the catalog has loaded; never waits for it
+    catalog = tenant().catalog
+    return catalog.names if catalog is not None and catalog.ready else None
 
+def overview_result(range_days: int, cur: dict, prev: dict) -> dict:
     def pct_change(cur_val: float, prev_val: float) -> float | None:
         if prev_val == 0:
             return None
@@ -139,6 +483,45 @@ def sales_overview(range_days: int = 7) -> dict:
     }
 
 
+# ---------- Conditional responses ----------
+async def conditional_json(request: Request, key: tuple, build: Callable[[], Awaitable[dict]],
+                           version=None, last_modified: datetime | None = None) -> Response:
+    """
+    JSON with ETag/Last-Modified. With a data `version` the ETag is known up
+    front: a matching If-None-Match gets a 304 without building anything, and
+    the serialized (and compressed) body is reused until the version changes.
+    Without one the ETag hashes the body, which still saves the bandwidth.
+    """
+    if version is None:
+        body = dumps(await build())
+        return snapshot_response(request, Snapshot(body, etag_for(body)))
+    full_key = (tenant().domain, *key, version)
+    snap = snapshots.get(full_key)
+    if snap is None:
+        etag = etag_for(full_key)
+        if not_modified(request, etag, last_modified):
+            # no body to negotiate a coding from: confirm the variant the client named
+            return not_modified_response(matched_etag(request, etag) or etag, last_modified)
+        snap = Snapshot(dumps(await build()), etag, last_modified)
+        snapshots.set(full_key, snap)
+    return snapshot_response(request, snap)
+
+def store_version(start_iso: str, window: str) -> tuple[tuple | None, datetime | None]:
+    """
+    (version, last modified) for a window the synced order store answers; (None, None) otherwise.
+    `window` is part of the version because the same data gives a different answer once
+    the window moves: pass the window start for calendar windows, rolling_step() for rolling ones.
+    """
+    t = tenant()
+    if t.order_sync and t.order_sync.covers(start_iso) and t.order_store.tz is not None:
+        return (t.order_store.version, window), t.order_store.modified_at
+    return None, None
+
+def rolling_step() -> str:
+    # rolling windows move every second; let their ETags live for ROLLING_WINDOW_STEP seconds
+    return f"step:{int(time.time() // ROLLING_WINDOW_STEP)}"
+
+
 # ---------- Models ----------
 class ChatIn(BaseModel):
     question: str
@@ -146,16 +529,29 @@ class ChatIn(BaseModel):
 
 # ---------- Endpoints ----------
 @app.get("/ping")
-def ping():
+async def ping():
     return {"message": "Backend is running!!!"}
 
 @app.get("/products")
-def products(limit: int = 5):
-    return shopify_get("products.json", params={"limit": limit})
+async def products(limit: int = 5):
+    return await shopify_get("products.json", params={"limit": limit})
 
 @app.get("/products_simple")
-def products_simple(limit: int = 10):
-    data = shopify_get(
+async def products_simple(request: Request, limit: int = 10, q: str | None = None):
+    catalog = tenant().catalog
+    if catalog is not None and catalog.ready:
+        # served from the in-memory mirror once its background load finished; `q` searches titles by word prefix
+        async def build() -> dict:
+            found = catalog.search(q, limit) if q else catalog.first(limit)
+            return {"products": [p.as_dict() for p in found]}
+
+        return await conditional_json(request, ("products_simple", limit, q), build,
+                                      catalog.version, catalog.modified_at)
+    # one products.json call while the mirror loads in the background (or without one); no search there
+    return await conditional_json(request, ("products_simple",), lambda: _products_simple_api(limit))
+
+async def _products_simple_api(limit: int) -> dict:
+    data = await shopify_get(
         "products.json",
         params={
             "limit": limit,
@@ -163,122 +559,187 @@ def products_simple(limit: int = 10):
             "fields": "id,title,image,images,variants",
         },
     )
-    products = []
-    for p in data.get("products", []):
-        price = (p.get("variants") or [{}])[0].get("price")
-        img = None
-        if p.get("image") and p["image"].get("src"):
-            img = p["image"]["src"]
-        elif (p.get("images") or [{}])[0].get("src"):
-            img = p["images"][0]["src"]
-        products.append({
-            "id": p["id"],
-            "title": p["title"],
-            "price": price,
-            "image": img,            # <- singular key (matches frontend)
-        })
-    return {"products": products}
+    # same projection as the catalog mirror: the image key is singular (matches frontend)
+    return {"products": [Product.from_json(p).as_dict() for p in data.get("products", [])]}
 
 @app.get("/orders_today")
-def orders_today():
-    params = {
-        "status": "any",
-        "created_at_min": start_of_today_utc_from_shop_tz(),
-        "fields": "id,total_price,created_at",
-        "limit": 250,
-    }
-    data = shopify_get("orders.json", params=params)
-    orders = data.get("orders", [])
-    return {
-        "count": len(orders),
-        "revenue": sum(float(o.get("total_price") or 0) for o in orders),
-    }
+async def orders_today(request: Request):
+    since = await start_of_today_utc_from_shop_tz()
+
+    async def build() -> dict:
+        summary = await summarize_window(since, fields="id,total_price,created_at")
+        return {"count": summary.count, "revenue": summary.revenue}
+
+    return await conditional_json(request, ("orders_today",), build, *store_version(since, since))
 
 @app.get("/orders_last_7d")
-def orders_last_7d():
-    since = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-    data = shopify_get("orders.json", params={
-        "status": "any",
-        "created_at_min": since,
-        "fields": "id,total_price,created_at",
-        "limit": 250,
-    })
-    orders = data.get("orders", [])
-    return {
-        "count": len(orders),
-        "revenue": sum(float(o.get("total_price") or 0) for o in orders),
-    }
+async def orders_last_7d(request: Request):
+    since = (utc_now() - timedelta(days=7)).isoformat()
+
+    async def build() -> dict:
+        summary = await summarize_window(since, fields="id,total_price,created_at")
+        return {"count": summary.count, "revenue": summary.revenue}
+
+    return await conditional_json(request, ("orders_last_7d",), build, *store_version(since, rolling_step()))
 
 @app.get("/top_selling_30d")
-def top_selling_30d(n: int = 1):
-    params = {
-        "status": "any",
-        "created_at_min": (datetime.now(timezone.utc) - timedelta(days=30)).isoformat(),
-        "fields": "id,created_at,line_items",
-        "limit": 250,
-    }
-    data = shopify_get("orders.json", params=params)
-    counts = Counter()
-    for o in data.get("orders", []):
-        for li in (o.get("line_items") or []):
-            counts[li.get("title", "Unknown")] += int(li.get("quantity") or 0)
-    top = [{"title": t, "units": u} for t, u in counts.most_common(n)]
-    return {"top": top}
+async def top_selling_30d(request: Request, n: int = 1):
+    since = (utc_now() - timedelta(days=30)).isoformat()
+    catalog = tenant().catalog
+
+    async def build() -> dict:
+        summary = await summarize_window(since, fields="id,created_at,line_items")
+        top = summary.result(top_n=n, names=product_names())["top_products"]
+        return {"top": [{"product_id": t["product_id"], "title": t["title"], "units": t["units"]} for t in top]}
+
+    version, modified = store_version(since, rolling_step())
+    if version is not None and catalog is not None:
+        # titles come from the catalog: a rename is a change too
+        version += (catalog.version,)
+        modified = max(modified, catalog.modified_at)
+    return await conditional_json(request, ("top_selling_30d", n), build, version, modified)
 
 @app.get("/orders_recent")
-def orders_recent():
-    return shopify_get("orders.json", params={
+async def orders_recent(request: Request):
+    # read straight from Shopify, so no data version: the ETag hashes the body
+    return await conditional_json(request, ("orders_recent",), lambda: shopify_get("orders.json", params={
         "limit": 5, "order": "created_at desc",
         "fields": "id,created_at,total_price"
-    })
+    }))
 
 @app.get("/orders_count")
-def order_count():
-    return shopify_get("orders/count.json")
+async def order_count():
+    return await shopify_get("orders/count.json")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/debug")
-def debug():
+async def debug():
+    t = tenant()
     return {
-        "SHOPIFY_STORE_DOMAIN": os.getenv("SHOPIFY_STORE_DOMAIN"),
-        "SHOPIFY_ACCESS_TOKEN_set": bool(os.getenv("SHOPIFY_ACCESS_TOKEN")),
+        "SHOPIFY_STORE_DOMAIN": t.domain,
+        "SHOPIFY_ACCESS_TOKEN_set": bool(t.client.access_token),
         "OPENAI_API_KEY_set": bool(os.getenv("OPENAI_API_KEY")),
         "ENV_PATH": str(ENV_PATH),
         "API_VERSION": API_VERSION,
+        "SHOPIFY_POOL_SIZE": POOL_SIZE,
+        "SHOPIFY_HTTP2": t.client.http2,
+        "TENANTS": {"configured": len(tenants), "active": len(tenants.active()), "fetch_slots": fetch_gate.stats()},
+        "FETCH_SLOTS": t.fetch_gate.stats(),
+        "INTENT_ROUTER": intent_router.stats(),
+        "WARM_FACTS": t.warmer.stats() if t.warmer else None,
+        "PRODUCT_CATALOG": t.catalog.stats() if t.catalog else None,
+        "SINGLE_FLIGHT": {"shopify": t.client.flights.stats(), "sales_overview": overview_flights.stats()},
+        "CHAT_CACHE": {"intent": intent_cache.stats(), "answer": answer_cache.stats()},
+        "SHOPIFY_CALL_LIMIT": {
+            "level": round(t.client.scheduler.level, 1),
+            "capacity": t.client.scheduler.capacity,
+            "in_flight": t.client.scheduler.in_flight,
+            "queued": len(t.client.scheduler._waiters),
+        },
+        "ORDER_STORE": {
+            "path": t.order_store.path,
+            "ready": t.order_sync.ready,
+            "orders": await asyncio.to_thread(t.order_store.count),
+            "last_sync": t.order_sync.last_sync.isoformat() if t.order_sync.last_sync else None,
+        } if t.order_sync else None,
     }
 
 
+# ---------- Webhooks ----------
+@app.post("/webhooks/shopify")
+async def shopify_webhook(request: Request):
+    body = await request.body()
+    if not WEBHOOK_SECRET:
+        raise HTTPException(status_code=500, detail="Missing SHOPIFY_WEBHOOK_SECRET in .env")
+    if not verify_webhook(body, request.headers.get("X-Shopify-Hmac-Sha256"), WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    topic = request.headers.get("X-Shopify-Topic", "")
+    catalog = tenant().catalog
+    if topic in PRODUCT_TOPICS and catalog is not None:
+        product = json.loads(body)
+        if topic == "products/delete":
+            catalog.remove(int(product["id"]))
+        else:
+            catalog.upsert(product)
+        return {"ok": True, "topic": topic, "product_id": product.get("id")}
+
+    store = tenant().order_store       # resolved from X-Shopify-Shop-Domain
+    if topic not in ORDER_TOPICS or store is None:
+        return {"ok": True, "ignored": topic}
+    order = json.loads(body)
+    await asyncio.to_thread(store.upsert, [order])
+    return {"ok": True, "topic": topic, "order_id": order.get("id")}
+
+
 # ---------- Chat ----------
-def classify_intent_llm(q: str) -> dict:
+INTENTS = ("sales_overview", "orders_today", "top_selling")
+classify_latency = LatencyWindow(default=LLM_HEDGE_DELAY)   # recent classification round trips, for the hedge delay
+
+async def classify_intent_llm(q: str) -> list[dict]:
     """
-    Use the model to choose an intent and range_days.
-    Falls back to heuristics if OpenAI isn't configured.
+    Use the model to split the question into (intent, range_days) tasks, one per
+    thing asked. Falls back to the local classifier if OpenAI isn't configured.
+    Hedged: an attempt slower than the usual LLM_HEDGE_PERCENTILE gets a twin,
+    and the first reply wins. Raises asyncio.TimeoutError past the deadline.
     """
-    if not oai:
-        ql = q.lower()
-        if "today" in ql:
-            return {"intent": "orders_today", "range_days": 1}
-        if "top" in ql and "sell" in ql:
-            return {"intent": "top_selling", "range_days": 30}
-        if any(k in ql for k in ("sales", "revenue", "performance", "how are", "doing")):
-            return {"intent": "sales_overview", "range_days": 7}
-        return {"intent": "sales_overview", "range_days": 7}
-
-    resp = oai.chat.completions.create(
-        model="gpt-4o-mini",
-        response_format={"type": "json_object"},
-        temperature=0,
-        messages=[
-            {"role": "system", "content":
-            "Return JSON with fields: intent ('sales_overview'|'orders_today'|'top_selling'), "
-            "range_days (one of 1,7,30). Choose 'sales_overview' for broad questions like 'how are sales doing'."},
-            {"role": "user", "content": q},
-        ],
-    )
+    oai = await load_openai_client()
+    if oai is None:
+        return [r.as_choice() for r in classify_local_tasks(q)]
+    budget = time_left(LLM_CLASSIFY_TIMEOUT)
+    if budget <= 0:
+        raise asyncio.TimeoutError
+
+    delay = classify_latency.percentile(LLM_HEDGE_PERCENTILE)
+
+    async def attempt():
+        METRICS.inc("llm_requests_total", call="classify")
+        started = time.monotonic()
+        try:
+            with METRICS.span("llm_classify"):
+                resp = await oai.chat.completions.create(
+                    model="gpt-4o-mini",
+                    response_format={"type": "json_object"},
+                    temperature=0,
+                    messages=[
+                        {"role": "system", "content":
+                        "Return JSON {\"tasks\": [{\"intent\": ..., \"range_days\": ...}, ...]} with one task per "
+                        "distinct thing the question asks (at most 3). intent is 'sales_overview'|'orders_today'|'top_selling', "
+                        "range_days one of 1,7,30. Choose 'sales_overview' for broad questions like 'how are sales doing'."},
+                        {"role": "user", "content": q},
+                    ],
+                    timeout=budget,
+                )
+        except asyncio.CancelledError:
+            # a hedge loser (or an attempt cut off by the deadline) is the slow tail; leaving it out
+            # would bias the percentile, and so push the hedge rate above LLM_HEDGE_PERCENTILE
+            classify_latency.record(max(time.monotonic() - started, delay))
+            raise
+        classify_latency.record(time.monotonic() - started)
+        return resp
+
+    resp, winner, attempts = await hedged(attempt, delay, budget)
+    outcome = "ok" if attempts == 1 else ("hedge_won" if winner == 2 else "hedge_lost")
+    METRICS.inc("llm_outcomes_total", call="classify", outcome=outcome)
     try:
         data = json.loads(resp.choices[0].message.content or "{}")
     except Exception:
         data = {}
-    intent = data.get("intent") or "sales_overview"
+    raw = data.get("tasks") if isinstance(data.get("tasks"), list) else [data]    # older single-intent shape
+    tasks = []
+    for item in raw[:MAX_TASKS]:
+        task = _parse_task(item if isinstance(item, dict) else {})
+        if task not in tasks:
+            tasks.append(task)
+    return tasks or [{"intent": "sales_overview", "range_days": 7}]
+
+def _parse_task(data: dict) -> dict:
+    intent = data.get("intent")
+    if intent not in INTENTS:
+        intent = "sales_overview"
     try:
         range_days = int(data.get("range_days") or 7)
     except Exception:
@@ -287,51 +748,282 @@ def classify_intent_llm(q: str) -> dict:
         range_days = 7
     return {"intent": intent, "range_days": range_days}
 
-def phrase_answer(question: str, facts: dict) -> str:
-    if not oai:
-        # Fallback phrasing without OpenAI
-        ov = facts.get("overview")
-        if ov:
-            cur = ov["current"]; prev = ov["previous"]
-            return (
-                f"Sales in last {ov['range_days']}d: {cur['orders_count']} orders, ${cur['revenue']:.2f} revenue "
-                f"(prev: {prev['orders_count']} / ${prev['revenue']:.2f}). "
-                f"Top items: " + ", ".join(f"{t['title']} ({t['units']}u, ${t['revenue']:.2f})" for t in cur["top_products"][:3])
-            )
-        return f"Facts: {facts}"
-    resp = oai.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.2,
-        messages=[
-            {"role": "system", "content":
-            "You are a concise Shopify assistant. Use ONLY the provided facts. "
-            "Return 2–4 bullet points: totals, week-over-week change, and top items with units & revenue. "
-            "If data is empty, say that and suggest placing a test order."},
-            {"role": "user", "content": f"Q: {question}\nFacts:\n{json.dumps(facts)}"},
-        ],
+def fallback_answer(facts: dict) -> str:
+    # Fallback phrasing without OpenAI
+    overviews = facts.get("overviews") or ([facts["overview"]] if facts.get("overview") else [])
+    if overviews:
+        return "\n".join(_overview_line(ov) for ov in overviews)
+    return f"Facts: {facts}"
+
+def _overview_line(ov: dict) -> str:
+    cur = ov["current"]; prev = ov["previous"]
+    return (
+        f"Sales in last {ov['range_days']}d: {cur['orders_count']} orders, ${cur['revenue']:.2f} revenue "
+        f"(prev: {prev['orders_count']} / ${prev['revenue']:.2f}). "
+        f"Top items: " + ", ".join(f"{t['title']} ({t['units']}u, ${t['revenue']:.2f})" for t in cur["top_products"][:3])
     )
+
+def answer_messages(question: str, facts: dict) -> list[dict]:
+    return [
+        {"role": "system", "content":
+        "You are a concise Shopify assistant. Use ONLY the provided facts. "
+        "Return 2–4 bullet points: totals, week-over-week change, and top items with units & revenue. "
+        "When the facts hold several overviews, answer each part of the question from its own range. "
+        "If data is empty, say that and suggest placing a test order."},
+        {"role": "user", "content": f"Q: {question}\nFacts:\n{prompt_facts(facts)}"},
+    ]
+
+def prompt_facts(facts: dict) -> str:
+    # the model never needs ids or nulls; compact separators cut the rest of the whitespace tokens
+    def strip(v):
+        if isinstance(v, dict):
+            return {k: strip(x) for k, x in v.items() if x is not None and k != "product_id"}
+        if isinstance(v, list):
+            return [strip(x) for x in v]
+        return v
+    return json.dumps(strip(facts), separators=(",", ":"), ensure_ascii=False)
+
+async def phrase_answer(question: str, facts: dict) -> str:
+    """The model's answer; raises asyncio.TimeoutError if the deadline passes first."""
+    oai = await load_openai_client()
+    if oai is None:
+        return fallback_answer(facts)
+    budget = time_left(LLM_ANSWER_TIMEOUT)
+    if budget <= 0:
+        raise asyncio.TimeoutError
+    METRICS.inc("llm_requests_total", call="answer")
+    with METRICS.span("llm_answer"):
+        resp = await asyncio.wait_for(oai.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0.2,
+            messages=answer_messages(question, facts),
+            timeout=budget,
+        ), budget)
+    METRICS.inc("llm_outcomes_total", call="answer", outcome="ok")
     return (resp.choices[0].message.content or "").strip()
 
+async def phrase_answer_stream(question: str, facts: dict) -> AsyncIterator[str]:
+    """
+    Same answer as phrase_answer, yielded piece by piece as the model produces it.
+    The deadline applies until the first token; once text is flowing it is let finish.
+    """
+    oai = await load_openai_client()
+    if oai is None:
+        for piece in split_words(fallback_answer(facts)):
+            yield piece
+        return
+    budget = time_left(LLM_ANSWER_TIMEOUT)
+    if budget <= 0:
+        raise asyncio.TimeoutError
+    METRICS.inc("llm_requests_total", call="answer_stream")
+    with METRICS.span("llm_answer"):
+        started = time.monotonic()
+        stream = await asyncio.wait_for(oai.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0.2,
+            messages=answer_messages(question, facts),
+            stream=True,
+            timeout=budget,
+        ), budget)
+        # closed on every exit (a missed first-token deadline, a client gone mid-answer), not left
+        # holding a pooled connection until GC
+        async with stream:
+            chunks = stream.__aiter__()
+            first = True
+            while True:
+                try:
+                    if first:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, budget - (time.monotonic() - started)))
+                    else:
+                        chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first:
+                        METRICS.inc("llm_outcomes_total", call="answer_stream", outcome="ok")
+                    first = False
+                    yield delta
+
+def split_words(text: str) -> Iterator[str]:
+    # word-sized chunks (keeping the spaces) so pre-built text streams like model output
+    yield from re.findall(r"\S+\s*", text)
+
+def normalize_question(q: str) -> str:
+    # "How are sales doing??" and "how are  sales doing" share a cache entry
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", q.lower()).split())
+
+def facts_hash(facts: dict) -> str:
+    # any change in the underlying orders changes the facts, and so the key
+    return hashlib.sha1(json.dumps(facts, sort_keys=True, default=str).encode()).hexdigest()
+
+async def classify_intent(q: str) -> list[dict]:
+    """(intent, range_days) tasks for the question; compound questions get several."""
+    # tier 1: local rules/centroids answer obvious questions without a round trip
+    routes = intent_router.try_local(q)
+    if routes:
+        return [r.as_choice() for r in routes]
+
+    # tier 2: the LLM, memoized on the normalized question
+    key = normalize_question(q)
+    tasks = intent_cache.get(key)
+    if tasks is None:
+        if OPENAI_API_KEY:
+            intent_router.record_llm()
+        try:
+            tasks = await classify_intent_llm(q)
+        except Exception as e:
+            # out of time or the API failed: the local classifier's best guess, not cached
+            METRICS.inc("llm_outcomes_total", call="classify", outcome=llm_failure(e))
+            return [r.as_choice() for r in classify_local_tasks(q)]
+        intent_cache.set(key, tasks)
+    return tasks
+
+def llm_failure(e: Exception) -> str:
+    if isinstance(e, asyncio.TimeoutError) or type(e).__name__ == "APITimeoutError":
+        return "deadline_fallback"
+    log.warning("OpenAI call failed: %s", e)
+    return "error_fallback"
+
+def answer_key(tasks: list[dict], facts: dict) -> tuple:
+    return (tuple((t["intent"], chat_range_days(t)) for t in tasks), facts_hash(facts))
+
+async def phrase_cached(q: str, tasks: list[dict], facts: dict) -> str:
+    key = answer_key(tasks, facts)
+    answer = answer_cache.get(key)
+    if answer is None:
+        try:
+            answer = await phrase_answer(q, facts)
+        except Exception as e:
+            # the template answer beats no answer; not cached, so the next ask tries the model again
+            METRICS.inc("llm_outcomes_total", call="answer", outcome=llm_failure(e))
+            return fallback_answer(facts)
+        answer_cache.set(key, answer)
+    return answer
+
+async def chat_facts_uncached(ranges: list[int]) -> dict[int, dict]:
+    if len(ranges) == 1:
+        return {ranges[0]: {"overview": await sales_overview(range_days=ranges[0])}}
+    # the warm-up refresh: every range from one fetch of the longest span
+    return {r: {"overview": o} for r, o in (await sales_overviews(ranges)).items()}
+
+async def chat_facts(range_days: int) -> dict:
+    # precomputed by the warm-up scheduler while fresh; computed here otherwise
+    warmer = tenant().warmer
+    if warmer is not None:
+        return await warmer.get(range_days)
+    return (await chat_facts_uncached([range_days]))[range_days]
+
+async def gather_facts(tasks: list[dict]) -> dict:
+    """
+    One facts bundle for every task, so the answer is phrased in a single call.
+    Tasks map onto overview ranges; overlapping ranges share one fetch.
+    """
+    ranges = sorted({chat_range_days(t) for t in tasks})
+    if len(ranges) == 1:
+        facts = await chat_facts(ranges[0])
+    else:
+        overviews = await chat_overviews(ranges)
+        facts = {"overviews": [overviews[r] for r in ranges]}
+    if len(tasks) > 1:
+        facts = {"tasks": tasks, **facts}
+    return facts
+
+async def chat_overviews(ranges: list[int]) -> dict[int, dict]:
+    warmer = tenant().warmer
+    if warmer is not None and all(warmer.fresh(r) for r in ranges):
+        return {r: (await warmer.get(r))["overview"] for r in ranges}
+    return await sales_overviews(ranges)
+
+def chat_range_days(choice: dict) -> int:
+    if choice["intent"] == "orders_today":
+        # use overview(1d) for richer details than count alone
+        return 1
+    if choice["intent"] == "top_selling":
+        return 30  # overview includes top_products
+    # default: sales_overview with selected range (1/7/30)
+    return choice["range_days"]
+
+EMPTY_QUESTION_HINT = "Ask me something like: 'How are my sales doing?', 'Orders today?', or 'Top sellers?'"
+
 @app.post("/chat")
-def chat(body: ChatIn):
+async def chat(body: ChatIn):
     q = body.question.strip()
     if not q:
-        return {"answer": "Ask me something like: 'How are my sales doing?', 'Orders today?', or 'Top sellers?'"}
-
-    choice = classify_intent_llm(q)
-    try:
-        if choice["intent"] == "orders_today":
-            # use overview(1d) for richer details than count alone
-            overview = sales_overview(range_days=1)
-            return {"answer": phrase_answer(q, {"overview": overview})}
+        return {"answer": EMPTY_QUESTION_HINT}
 
-        if choice["intent"] == "top_selling":
-            overview = sales_overview(range_days=30)  # includes top_products
-            return {"answer": phrase_answer(q, {"overview": overview})}
+    # a merchant is waiting: jump ahead of dashboard polling and background sync
+    request_priority.set(INTERACTIVE)
+    request_deadline.set(chat_deadline())
 
-        # default: sales_overview with selected range (1/7/30)
-        overview = sales_overview(range_days=choice["range_days"])
-        return {"answer": phrase_answer(q, {"overview": overview})}
+    tasks = await classify_intent(q)
+    try:
+        facts = await gather_facts(tasks)
+        return {"answer": await phrase_cached(q, tasks, facts)}
 
     except Exception as e:
         return {"answer": f"Sorry, I hit an error while checking Shopify: {e!s}"}  # friendly error
+
+def chat_deadline() -> float | None:
+    # the whole request's budget: facts first, the LLM calls get what is left
+    return time.monotonic() + CHAT_DEADLINE if CHAT_DEADLINE > 0 else None
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(body: ChatIn):
+    """
+    Server-Sent Events version of /chat: a `facts` event as soon as the numbers
+    are in, `token` events as the answer is generated, then `done` with the
+    full answer (or `error`).
+    """
+    q = body.question.strip()
+    request_priority.set(INTERACTIVE)
+    deadline = chat_deadline()
+
+    async def events():
+        request_deadline.set(deadline)
+        if not q:
+            yield sse("token", {"text": EMPTY_QUESTION_HINT})
+            yield sse("done", {"answer": EMPTY_QUESTION_HINT})
+            return
+        try:
+            tasks = await classify_intent(q)
+            facts = await gather_facts(tasks)
+        except Exception as e:
+            yield sse("error", {"message": f"Sorry, I hit an error while checking Shopify: {e!s}"})
+            return
+        yield sse("facts", {"tasks": tasks, **facts})
+
+        key = answer_key(tasks, facts)
+        answer = answer_cache.get(key)
+        if answer is not None:
+            for piece in split_words(answer):
+                yield sse("token", {"text": piece})
+        else:
+            parts = []
+            try:
+                async for piece in phrase_answer_stream(q, facts):
+                    parts.append(piece)
+                    yield sse("token", {"text": piece})
+            except Exception as e:
+                if parts:
+                    yield sse("error", {"message": f"Sorry, I hit an error while writing the answer: {e!s}"})
+                    return
+                # nothing sent yet: stream the template answer instead (not cached)
+                METRICS.inc("llm_outcomes_total", call="answer_stream", outcome=llm_failure(e))
+                answer = fallback_answer(facts)
+                for piece in split_words(answer):
+                    yield sse("token", {"text": piece})
+                yield sse("done", {"answer": answer})
+                return
+            answer = "".join(parts).strip()
+            answer_cache.set(key, answer)
+        yield sse("done", {"answer": answer})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
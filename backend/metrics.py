@@ -0,0 +1,130 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable
+import bisect, threading, time
+
+# Per-request stage totals: {stage: [seconds, count]}; set by the HTTP middleware
+request_timings: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "http_request_duration_seconds": "Time to produce the response headers, by route",
+    "stage_duration_seconds": "Time spent per hot-path stage (shopify, summarize, llm_classify, ...)",
+    "shopify_requests_total": "Upstream Shopify Admin API calls, by endpoint and status",
+    "shopify_retries_total": "Shopify calls retried, by reason",
+    "shopify_response_bytes_total": "Bytes received from Shopify (REST pages and bulk results)",
+    "llm_requests_total": "OpenAI chat completion calls, by call site",
+    "llm_outcomes_total": "How each LLM step ended: ok, hedge_won/hedge_lost, deadline_fallback or error_fallback",
+    "warm_facts_total": "Chat fact lookups: precomputed (hit), too old (stale) or never computed (miss)",
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{v}"' for k, v in labels)
+        return f"{name}{{{inner}}} {value:g}"
+    return f"{name} {value:g}"
+
+
+# ---------- Metrics registry ----------
+class Registry:
+    """
+    Process-wide counters and histograms rendered in the Prometheus text
+    format. `collect()` hooks let components that already keep their own
+    counts (caches, single-flight) show up without double bookkeeping.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()      # LLM calls record from worker threads
+        self._counters: dict[str, dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._hists: dict[str, dict[Labels, list]] = defaultdict(dict)
+        self._collectors: list[tuple[str, str, Callable[[], dict[Labels, float]]]] = []
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self._counters[name][_labels(labels)] += value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            hist = self._hists[name].get(key)
+            if hist is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                hist = self._hists[name][key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time a block into stage_duration_seconds and the current request's Server-Timing."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_duration_seconds", elapsed, stage=stage)
+            timings = request_timings.get()
+            if timings is not None:
+                agg = timings.setdefault(stage, [0.0, 0])
+                agg[0] += elapsed
+                agg[1] += 1
+
+    def collect(self, name: str, kind: str, fn: Callable[[], dict[Labels, float]], help: str = "") -> None:
+        """Register `fn`, called at scrape time, returning {labels: value} for metric `name`."""
+        if help:
+            HELP.setdefault(name, help)
+        self._collectors.append((name, kind, fn))
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        def header(name: str, kind: str):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = {n: dict(series) for n, series in self._counters.items()}
+            hists = {n: {k: [list(h[0]), h[1], h[2]] for k, h in series.items()} for n, series in self._hists.items()}
+        for name, series in sorted(counters.items()):
+            header(name, "counter")
+            lines.extend(_fmt(name, labels, v) for labels, v in sorted(series.items()))
+        for name, series in sorted(hists.items()):
+            header(name, "histogram")
+            for labels, (counts, total, count) in sorted(series.items()):
+                running = 0
+                for bound, n in zip((*self.buckets, float("inf")), counts):
+                    running += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(_fmt(f"{name}_bucket", (*labels, ("le", le)), running))
+                lines.append(_fmt(f"{name}_sum", labels, round(total, 6)))
+                lines.append(_fmt(f"{name}_count", labels, count))
+        for name, kind, fn in self._collectors:
+            header(name, kind)
+            lines.extend(_fmt(name, labels, v) for labels, v in sorted(fn().items()))
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+
+def server_timing(timings: dict, total: float) -> str:
+    """`Server-Timing` header value: one entry per stage (summed ms, call count) plus the total."""
+    parts = [f'{stage};dur={secs * 1000:.1f};desc="{n}x"' for stage, (secs, n) in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def labelled(pairs: Iterable[tuple[str, float]], label: str) -> dict[Labels, float]:
+    # helper for collect(): [("intent", 3), ...] -> {(("cache", "intent"),): 3, ...}
+    return {((label, str(k)),): v for k, v in pairs}
@@ -0,0 +1,344 @@
+from datetime import date, datetime, timezone, timedelta
+from typing import AsyncIterator
+from zoneinfo import ZoneInfo
+import asyncio, json, sqlite3, threading
+
+from analytics import OrderSummary
+from incremental_sync import IncrementalSync
+from orders_model import product_key, to_cents, to_epoch
+from shop_meta import ShopMetaCache
+from shopify_client import ShopifyClient
+
+SYNC_FIELDS = "id,created_at,updated_at,cancelled_at,total_price,line_items"
+LINE_ITEM_KEYS = ("product_id", "title", "quantity", "price")
+
+
+# ---------- Local order store ----------
+class OrderStore:
+    """
+    Embedded SQLite mirror of the shop's orders, indexed by created_at.
+    Only the fields analytics needs are kept; line items are stored as JSON.
+
+    Once the shop timezone is known, every write also maintains per-day
+    rollups (order count, revenue, per-product units/revenue; money in
+    integer cents), so a window is answered by merging day buckets instead
+    of re-walking line items.
+    """
+
+    ROLLUP_TZ_KEY = "rollup_tz"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tz: ZoneInfo | None = None
+        self.version = 0        # bumped on every write; lets readers tell when data changed
+        self.modified_at = datetime.now(timezone.utc)      # when `version` last changed
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            cols = {row[1] for row in self._db.execute("PRAGMA table_info(daily_totals)")}
+            product_cols = {row[1] for row in self._db.execute("PRAGMA table_info(daily_products)")}
+            if cols and ("revenue_cents" not in cols or "product_key" not in product_cols):
+                # rollups from before money was kept in cents or products were keyed by id:
+                # drop them, set_timezone() rebuilds
+                self._db.executescript("DROP TABLE daily_totals; DROP TABLE daily_products;")
+                self._db.execute("DELETE FROM sync_state WHERE key = ?", (self.ROLLUP_TZ_KEY,))
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS orders (
+                    id           INTEGER PRIMARY KEY,
+                    created_at   REAL NOT NULL,
+                    created_iso  TEXT NOT NULL,
+                    updated_at   TEXT,
+                    updated_epoch REAL NOT NULL DEFAULT 0,   -- orders the versions of one order; 0 = unknown
+                    cancelled_at TEXT,
+                    total_price  TEXT,
+                    line_items   TEXT
+                );
+                CREATE INDEX IF NOT EXISTS orders_created_at ON orders (created_at, id);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key   TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS daily_totals (
+                    day           TEXT PRIMARY KEY,   -- shop-local YYYY-MM-DD
+                    orders_count  INTEGER NOT NULL,
+                    revenue_cents INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS daily_products (
+                    day           TEXT NOT NULL,
+                    product_key   NOT NULL,           -- product id, or title for custom items (no affinity: ints stay ints)
+                    title         TEXT NOT NULL,      -- latest line-item title
+                    units         INTEGER NOT NULL,
+                    revenue_cents INTEGER NOT NULL,
+                    PRIMARY KEY (day, product_key)
+                );
+            """)
+            if "updated_epoch" not in {r[1] for r in self._db.execute("PRAGMA table_info(orders)")}:
+                # stores from before out-of-order webhooks were detected
+                self._db.execute("ALTER TABLE orders ADD COLUMN updated_epoch REAL NOT NULL DEFAULT 0")
+                self._db.executemany("UPDATE orders SET updated_epoch = ? WHERE id = ?", [
+                    (to_epoch(u), oid) for oid, u in self._db.execute(
+                        "SELECT id, updated_at FROM orders WHERE updated_at IS NOT NULL").fetchall()
+                ])
+            row = self._db.execute("SELECT value FROM sync_state WHERE key = ?", (self.ROLLUP_TZ_KEY,)).fetchone()
+        if row is not None:
+            # the rollups on disk are current for this zone: keep maintaining them from the first write
+            self.tz = ZoneInfo(row[0])
+
+    # --- sync state ---
+    def get_state(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    # --- rollups ---
+    def set_timezone(self, tzname: str) -> None:
+        """Bucket rollups by the shop's local day; rebuilds them if the timezone changed."""
+        self.tz = ZoneInfo(tzname)
+        if self.get_state(self.ROLLUP_TZ_KEY) != tzname:
+            self.rebuild_rollups()
+            self.set_state(self.ROLLUP_TZ_KEY, tzname)
+
+    def _day(self, created_at: float) -> str:
+        return datetime.fromtimestamp(created_at, self.tz).date().isoformat()
+
+    def _apply(self, day: str, total_price: str | None, items: list[dict], sign: int) -> None:
+        # caller holds the lock and the transaction
+        self._db.execute(
+            "INSERT INTO daily_totals (day, orders_count, revenue_cents) VALUES (?, ?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET orders_count = orders_count + excluded.orders_count, "
+            "revenue_cents = revenue_cents + excluded.revenue_cents",
+            (day, sign, sign * to_cents(total_price)),
+        )
+        per_product: dict[int | str, list] = {}
+        for li in items:
+            q = int(li.get("quantity") or 0)
+            title = li.get("title") or "Unknown"
+            agg = per_product.setdefault(product_key(li.get("product_id"), title), [title, 0, 0])
+            agg[0] = title
+            agg[1] += q
+            agg[2] += q * to_cents(li.get("price"))
+        self._db.executemany(
+            "INSERT INTO daily_products (day, product_key, title, units, revenue_cents) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(day, product_key) DO UPDATE SET units = units + excluded.units, "
+            "revenue_cents = revenue_cents + excluded.revenue_cents, title = excluded.title",
+            [(day, k, t, sign * u, sign * r) for k, (t, u, r) in per_product.items()],
+        )
+
+    def rebuild_rollups(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM daily_totals")
+            self._db.execute("DELETE FROM daily_products")
+            self.version += 1
+            self.modified_at = datetime.now(timezone.utc)
+            if self.tz is None:
+                return
+            for created_at, total_price, items in self._db.execute(
+                "SELECT created_at, total_price, line_items FROM orders"
+            ).fetchall():
+                self._apply(self._day(created_at), total_price, json.loads(items or "[]"), +1)
+
+    def _rollup_summary(self, first: date, last: date, summary: OrderSummary) -> None:
+        lo, hi = first.isoformat(), last.isoformat()
+        with self._lock:
+            count, revenue_cents = self._db.execute(
+                "SELECT COALESCE(SUM(orders_count), 0), COALESCE(SUM(revenue_cents), 0) "
+                "FROM daily_totals WHERE day BETWEEN ? AND ?", (lo, hi),
+            ).fetchone()
+            # with MAX(day), SQLite takes the bare `title` from the latest day's row
+            rows = self._db.execute(
+                "SELECT product_key, SUM(units), SUM(revenue_cents), title, MAX(day) FROM daily_products "
+                "WHERE day BETWEEN ? AND ? GROUP BY product_key HAVING SUM(units) != 0", (lo, hi),
+            ).fetchall()
+        summary.merge(
+            count, revenue_cents,
+            {k: u for k, u, _, _, _ in rows},
+            {k: r for k, _, r, _, _ in rows},
+            {k: t for k, _, _, t, _ in rows if not isinstance(k, str)},
+        )
+
+    async def summarize_between(self, start_iso: str, end_iso: str) -> OrderSummary:
+        """
+        Summary of orders created in [start_iso, end_iso]: whole shop-local days
+        come from the rollups, the partial days at either edge from raw rows.
+        """
+        summary = OrderSummary()
+        start = datetime.fromisoformat(start_iso.replace("Z", "+00:00")).astimezone(self.tz)
+        end = datetime.fromisoformat(end_iso.replace("Z", "+00:00")).astimezone(self.tz)
+        first = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+        last = end.date() - timedelta(days=1)     # the day containing `end` is partial
+        if self.tz is None or first > last:
+            async for o in self.iter_between(start_iso, end_iso):
+                summary.add(o)
+            return summary
+
+        first_midnight = datetime(first.year, first.month, first.day, tzinfo=self.tz)
+        after_last = last + timedelta(days=1)
+        after_last_midnight = datetime(after_last.year, after_last.month, after_last.day, tzinfo=self.tz)
+        await asyncio.to_thread(self._rollup_summary, first, last, summary)
+        async for o in self.iter_between(start_iso, first_midnight.isoformat(), end_inclusive=False):
+            summary.add(o)
+        async for o in self.iter_between(after_last_midnight.isoformat(), end_iso):
+            summary.add(o)
+        return summary
+
+    # --- writes ---
+    def upsert(self, orders: list[dict]) -> int:
+        """
+        Insert or update orders; returns how many were written. Webhooks arrive
+        out of order and are retried for up to 48h, so a version no newer than
+        the stored one (by updated_at) is ignored.
+        """
+        latest: dict[int, tuple] = {}
+        for o in orders:
+            items = [{k: li.get(k) for k in LINE_ITEM_KEYS} for li in (o.get("line_items") or [])]
+            row = (
+                int(o["id"]),
+                to_epoch(o["created_at"]),
+                o["created_at"],
+                o.get("updated_at"),
+                to_epoch(o["updated_at"]) if o.get("updated_at") else 0.0,
+                o.get("cancelled_at"),
+                o.get("total_price"),
+                json.dumps(items, separators=(",", ":")),
+            )
+            if row[0] not in latest or row[4] >= latest[row[0]][4]:
+                latest[row[0]] = row
+        if not latest:
+            return 0        # an empty sync page changes nothing; keep `version` (and so ETags) as is
+        with self._lock, self._db:
+            stored: dict[int, tuple] = {}
+            ids = list(latest)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for oid, updated_epoch, created_at, total_price, items in self._db.execute(
+                    "SELECT id, updated_epoch, created_at, total_price, line_items FROM orders "
+                    f"WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall():
+                    stored[oid] = (updated_epoch, created_at, total_price, items)
+            rows = [r for r in latest.values() if r[0] not in stored or r[4] >= stored[r[0]][0]]
+            if not rows:
+                return 0    # only stale redeliveries
+            if self.tz is not None:
+                # back out the previous version of each order before counting the new one
+                for r in rows:
+                    if r[0] in stored:
+                        _, created_at, total_price, items = stored[r[0]]
+                        self._apply(self._day(created_at), total_price, json.loads(items or "[]"), -1)
+                for _, created_at, _, _, _, _, total_price, items in rows:
+                    self._apply(self._day(created_at), total_price, json.loads(items), +1)
+            self._db.executemany(
+                "INSERT INTO orders (id, created_at, created_iso, updated_at, updated_epoch, cancelled_at, total_price, "
+                "line_items) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET created_at = excluded.created_at, created_iso = excluded.created_iso, "
+                "updated_at = excluded.updated_at, updated_epoch = excluded.updated_epoch, "
+                "cancelled_at = excluded.cancelled_at, total_price = excluded.total_price, "
+                "line_items = excluded.line_items WHERE excluded.updated_epoch >= orders.updated_epoch",
+                rows,
+            )
+            self.version += 1
+            self.modified_at = datetime.now(timezone.utc)
+        return len(rows)
+
+    # --- reads ---
+    def _page(self, start: float, end: float, end_inclusive: bool,
+              after: tuple[float, int] | None, size: int) -> list[tuple]:
+        sql = "SELECT id, created_at, created_iso, total_price, line_items FROM orders WHERE "
+        sql += "created_at <= ? AND " if end_inclusive else "created_at < ? AND "
+        if after is None:
+            sql += "created_at >= ? ORDER BY created_at, id LIMIT ?"
+            args = (end, start, size)
+        else:
+            sql += "(created_at, id) > (?, ?) ORDER BY created_at, id LIMIT ?"
+            args = (end, after[0], after[1], size)
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    async def iter_between(self, start_iso: str, end_iso: str | None = None, chunk: int = 1000,
+                           end_inclusive: bool = True) -> AsyncIterator[dict]:
+        """Yield orders created in [start_iso, end_iso] in created_at order, `chunk` rows per query."""
+        start = to_epoch(start_iso)
+        end = to_epoch(end_iso) if end_iso else float("inf")
+        after = None
+        while True:
+            rows = await asyncio.to_thread(self._page, start, end, end_inclusive, after, chunk)
+            for oid, _, created_iso, total_price, items in rows:
+                yield {
+                    "id": oid,
+                    "created_at": created_iso,
+                    "total_price": total_price,
+                    "line_items": json.loads(items or "[]"),
+                }
+            if len(rows) < chunk:
+                return
+            after = (rows[-1][1], rows[-1][0])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# ---------- Incremental sync ----------
+class OrderSync(IncrementalSync):
+    """
+    Keeps an OrderStore up to date by polling orders.json with updated_at_min.
+    The first run backfills `backfill_days` of history; after that only orders
+    touched since the stored high-water mark are fetched. SQLite work runs in
+    a thread, so a page upsert or a rollup rebuild never stalls the event loop.
+    """
+
+    resource = "orders.json"
+    label = "order sync"
+    HWM_KEY = "updated_at_hwm"
+    HORIZON_KEY = "backfill_from"
+
+    def __init__(self, client: ShopifyClient, store: OrderStore, shop_meta: ShopMetaCache | None = None,
+                 backfill_days: int = 90, interval: float = 60.0, overlap: float = 60.0):
+        super().__init__(client, interval, overlap)
+        self.store = store
+        self.shop_meta = shop_meta
+        self.backfill_days = backfill_days
+        self.ready = store.get_state(self.HWM_KEY) is not None
+        self.horizon = store.get_state(self.HORIZON_KEY)     # kept in memory: covers() runs on every request
+
+    async def apply(self, page: list[dict]) -> None:
+        await asyncio.to_thread(self.store.upsert, page)
+
+    async def sync_once(self) -> None:
+        started = datetime.now(timezone.utc)
+        if self.shop_meta is not None:
+            # a changed zone (or a store upgraded to a new rollup schema) rebuilds every rollup
+            await asyncio.to_thread(self.store.set_timezone, await self.shop_meta.timezone_name())
+        hwm = await asyncio.to_thread(self.store.get_state, self.HWM_KEY)
+        params = {"status": "any", "fields": SYNC_FIELDS, "limit": 250}
+        if hwm is None:
+            horizon = (started - timedelta(days=self.backfill_days)).isoformat()
+            await self.pull({**params, "created_at_min": horizon})
+            await asyncio.to_thread(self.store.set_state, self.HORIZON_KEY, horizon)
+            self.horizon = horizon
+            # anything updated after the backfill began is picked up next round
+            new_hwm = started.isoformat()
+        else:
+            new_hwm = await self.pull_since(params, hwm)
+        await asyncio.to_thread(self.store.set_state, self.HWM_KEY, new_hwm)
+        self.ready = True
+        self.last_sync = started
+
+    def covers(self, start_iso: str) -> bool:
+        """True once the store is synced and holds history back to `start_iso`."""
+        if not self.ready or self.horizon is None:
+            return False
+        return to_epoch(start_iso) >= to_epoch(self.horizon)
@@ -0,0 +1,86 @@
+from datetime import datetime
+import json
+
+try:
+    import orjson   # optional: several times faster than json on large pages
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+def to_cents(value) -> int:
+    """Shopify money strings ("19.99") as integer cents; exact for 2-decimal amounts."""
+    if not value:
+        return 0
+    return int(round(float(value) * 100))
+
+
+def to_epoch(iso: str) -> float:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+def product_key(product_id: int | None, title: str) -> int | str:
+    """Line items aggregate by product id, so a renamed product stays one row; custom items have only a title."""
+    return title if product_id is None else product_id
+
+
+def product_title(key: int | str, names: dict[int, str] | None, seen: dict[int, str]) -> str:
+    # current catalog title first, else the latest title seen on a line item
+    if isinstance(key, str):
+        return key
+    return (names.get(key) if names else None) or seen.get(key) or "Unknown"
+
+
+# ---------- Compact order model ----------
+class LineItem:
+    __slots__ = ("product_id", "title", "quantity", "price_cents")
+
+    def __init__(self, product_id: int | None, title: str, quantity: int, price_cents: int):
+        self.product_id = product_id
+        self.title = title
+        self.quantity = quantity
+        self.price_cents = price_cents
+
+
+class Order:
+    """Only what analytics reads: id, created_at (epoch seconds), total and line items in cents."""
+
+    __slots__ = ("id", "created_at", "total_cents", "items")
+
+    def __init__(self, id: int, created_at: float, total_cents: int, items: tuple[LineItem, ...]):
+        self.id = id
+        self.created_at = created_at
+        self.total_cents = total_cents
+        self.items = items
+
+    @classmethod
+    def from_json(cls, o: dict, titles: dict[str, str] | None = None) -> "Order":
+        """`titles` shares one string per distinct title across the orders of a page."""
+        return cls(
+            o["id"],
+            to_epoch(o["created_at"]) if o.get("created_at") else 0.0,
+            to_cents(o.get("total_price")),
+            tuple(
+                LineItem(
+                    li.get("product_id"),
+                    _shared(titles, li.get("title", "Unknown")),
+                    int(li.get("quantity") or 0),
+                    to_cents(li.get("price")),
+                )
+                for li in (o.get("line_items") or ())
+            ),
+        )
+
+
+def _shared(titles: dict[str, str] | None, title: str) -> str:
+    return title if titles is None else titles.setdefault(title, title)
+
+
+def parse_orders(body: bytes, key: str = "orders") -> list[Order]:
+    """
+    Turn one orders.json response body straight into compact Orders. The parsed
+    dicts only live for the duration of this call, i.e. one page at a time, and
+    line items of the page share one string per title.
+    """
+    titles: dict[str, str] = {}
+    return [Order.from_json(o, titles) for o in loads(body).get(key, [])]
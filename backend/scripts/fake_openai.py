@@ -0,0 +1,106 @@
+"""
+A fake OpenAI Chat Completions endpoint for local runs and benchmarks.
+
+    python scripts/fake_openai.py --port 8901 --first-token-ms 300 --token-ms 25
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8901/v1 and any
+OPENAI_API_KEY. JSON-mode requests (intent classification) are answered with
+the local intent classifier's choice after --first-token-ms; other requests
+get a short canned answer, one word every --token-ms, streamed or not.
+GET /_stats reports call counts.
+"""
+from collections import Counter
+from pathlib import Path
+import argparse, asyncio, json, sys, time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from intent_router import classify_local_tasks  # noqa: E402
+
+ANSWER = (
+    "- Orders are steady versus the previous period.\n"
+    "- Revenue moved in line with order count.\n"
+    "- Your top items led on both units and revenue."
+)
+
+
+def _completion(content: str, model: str) -> dict:
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": 0},
+    }
+
+
+def _chunk(delta: dict, model: str, finish: str | None = None) -> str:
+    body = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+
+def create_app(first_token_ms: float = 300.0, token_ms: float = 25.0) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    calls: Counter = Counter()
+
+    @app.get("/_stats")
+    async def stats():
+        return {"calls": sum(calls.values()), "by_kind": dict(calls)}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        await asyncio.sleep(first_token_ms / 1000)
+
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            calls["classify"] += 1
+            question = body["messages"][-1]["content"]
+            tasks = [r.as_choice() for r in classify_local_tasks(question)]
+            return _completion(json.dumps({"tasks": tasks}), model)
+
+        words = ANSWER.split(" ")
+        if not body.get("stream"):
+            calls["answer"] += 1
+            await asyncio.sleep(token_ms * len(words) / 1000)
+            return _completion(ANSWER, model)
+
+        calls["answer_stream"] += 1
+
+        async def events():
+            yield _chunk({"role": "assistant", "content": ""}, model)
+            for i, word in enumerate(words):
+                await asyncio.sleep(token_ms / 1000)
+                yield _chunk({"content": word if i == 0 else " " + word}, model)
+            yield _chunk({}, model, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8901)
+    ap.add_argument("--first-token-ms", type=float, default=300.0, help="delay before the first token")
+    ap.add_argument("--token-ms", type=float, default=25.0, help="delay between streamed tokens")
+    args = ap.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.first_token_ms, args.token_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+A small fake Shopify Admin API for local runs, benchmarks and smoke tests.
+
+    python scripts/fake_shopify.py --port 8900 --orders 5000 --days 120
+    python scripts/fake_shopify.py --bulk-file scripts/bulk_samples/orders.jsonl
+    python scripts/fake_shopify.py --latency-ms 80 --jitter-ms 40 --throttle-rate 0.05
+
+Point the backend at it with SHOPIFY_API_BASE=http://127.0.0.1:8900 (any
+SHOPIFY_STORE_DOMAIN / SHOPIFY_ACCESS_TOKEN will do). It serves shop.json,
+orders.json (with Link-header page_info cursors), orders/count.json,
+products.json and the GraphQL bulk operation flow: bulkOperationRunQuery,
+currentBulkOperation polling, bulkOperationCancel and the JSONL result download. With --bulk-file
+every bulk operation returns that canned JSONL file as-is; otherwise the
+result is generated from the synthetic orders matching the query.
+
+--latency-ms/--jitter-ms delay every Admin API response and --throttle-rate
+answers that fraction of calls with 429 + Retry-After. GET /_stats reports
+call counts (used by bench/load_benchmark.py for upstream calls per request).
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import quote
+import argparse, asyncio, base64, itertools, json, random, re, time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CREATED_RE = re.compile(r"created_at:(>=|<=)'([^']+)'")
+PRODUCT_TITLES = [
+    "Classic Tee", "Canvas Tote", "Wool Beanie", "Rain Jacket", "Trail Socks", "Linen Shirt",
+    "Denim Cap", "Travel Mug", "Leather Belt", "Sun Hat", "Hoodie", "Yoga Mat",
+]
+
+
+def parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def make_orders(count: int, days: int, seed: int = 1) -> list[dict]:
+    """Synthetic orders spread over the last `days`, newest first (like orders.json)."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    orders = []
+    for i in range(count):
+        created = now - timedelta(seconds=rng.randint(0, days * 86400))
+        items = []
+        for pid in rng.sample(range(len(PRODUCT_TITLES)), rng.randint(1, 3)):
+            items.append({
+                "product_id": 1000 + pid,
+                "title": PRODUCT_TITLES[pid],
+                "quantity": rng.randint(1, 3),
+                "price": f"{rng.randint(500, 9000) / 100:.2f}",
+            })
+        total = sum(li["quantity"] * int(li["price"].replace(".", "")) for li in items)
+        orders.append({
+            "id": 5_000_000 + i,
+            "created_at": created.isoformat(),
+            "updated_at": created.isoformat(),
+            "cancelled_at": None,
+            "total_price": f"{total / 100:.2f}",
+            "line_items": items,
+        })
+    orders.sort(key=lambda o: o["created_at"], reverse=True)
+    return orders
+
+
+def bulk_lines(orders: list[dict]):
+    """Orders in bulk-result JSONL form: one line per order, then one per line item with __parentId."""
+    for o in orders:
+        gid = f"gid://shopify/Order/{o['id']}"
+        yield json.dumps({
+            "id": gid,
+            "createdAt": o["created_at"],
+            "totalPriceSet": {"shopMoney": {"amount": o["total_price"]}},
+        }) + "\n"
+        for li in o["line_items"]:
+            yield json.dumps({
+                "title": li["title"],
+                "quantity": li["quantity"],
+                "originalUnitPriceSet": {"shopMoney": {"amount": li["price"]}},
+                "product": {"id": f"gid://shopify/Product/{li['product_id']}"},
+                "__parentId": gid,
+            }) + "\n"
+
+
+def _cursor(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def _uncursor(token: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(token.encode()))
+
+
+def create_app(orders: list[dict], bulk_file: Path | None = None, bulk_seconds: float = 0.5,
+               timezone_name: str = "America/New_York", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+               throttle_rate: float = 0.0, retry_after: float = 1.0, seed: int = 1) -> FastAPI:
+    app = FastAPI(title="Fake Shopify")
+    calls: Counter = Counter()
+    throttled = Counter()
+    rng = random.Random(seed)
+    bulk_ops: dict[str, dict] = {}
+    op_ids = itertools.count(1)
+    current: dict = {}
+
+    @app.middleware("http")
+    async def upstream_conditions(request: Request, call_next):
+        path = request.url.path
+        if not path.startswith("/admin/"):
+            return await call_next(request)
+        endpoint = path.split("/", 4)[-1]
+        calls[endpoint] += 1
+        delay = latency_ms + rng.uniform(0, jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if throttle_rate and rng.random() < throttle_rate:
+            throttled[endpoint] += 1
+            return JSONResponse({"errors": "Exceeded 2 calls per second for api client."},
+                                status_code=429, headers={"Retry-After": f"{retry_after:g}"})
+        return await call_next(request)
+
+    @app.get("/_stats")
+    async def stats():
+        return {"calls": sum(calls.values()), "throttled": sum(throttled.values()),
+                "by_endpoint": dict(calls), "throttled_by_endpoint": dict(throttled)}
+
+    def select(filters: dict) -> list[dict]:
+        lo = parse_ts(filters["created_at_min"]) if filters.get("created_at_min") else None
+        hi = parse_ts(filters["created_at_max"]) if filters.get("created_at_max") else None
+        upd = parse_ts(filters["updated_at_min"]) if filters.get("updated_at_min") else None
+        out = []
+        for o in orders:
+            created = parse_ts(o["created_at"])
+            if lo and created < lo or hi and created > hi:
+                continue
+            if upd and parse_ts(o["updated_at"]) < upd:
+                continue
+            out.append(o)
+        return out
+
+    def project(o: dict, fields: str | None) -> dict:
+        if not fields:
+            return o
+        keep = fields.split(",")
+        return {k: v for k, v in o.items() if k in keep}
+
+    @app.get("/admin/api/{version}/shop.json")
+    async def shop():
+        return {"shop": {"name": "Fake Shop", "iana_timezone": timezone_name, "currency": "USD"}}
+
+    @app.get("/admin/api/{version}/orders/count.json")
+    async def orders_count(request: Request):
+        return {"count": len(select(dict(request.query_params)))}
+
+    @app.get("/admin/api/{version}/orders.json")
+    async def orders_page(request: Request, version: str):
+        q = dict(request.query_params)
+        limit = min(int(q.get("limit", 50)), 250)
+        state = _uncursor(q["page_info"]) if "page_info" in q else {
+            k: q.get(k) for k in ("created_at_min", "created_at_max", "updated_at_min")
+        } | {"offset": 0}
+        matched = select(state)
+        page = matched[state["offset"]:state["offset"] + limit]
+        headers = {"X-Shopify-Shop-Api-Call-Limit": "1/40"}
+        if state["offset"] + limit < len(matched):
+            nxt = _cursor(dict(state, offset=state["offset"] + limit))
+            url = f"{str(request.base_url).rstrip('/')}/admin/api/{version}/orders.json?limit={limit}&page_info={quote(nxt)}"
+            headers["Link"] = f'<{url}>; rel="next"'
+        return JSONResponse({"orders": [project(o, q.get("fields")) for o in page]}, headers=headers)
+
+    @app.get("/admin/api/{version}/products.json")
+    async def products():
+        now = datetime.now(timezone.utc).isoformat()
+        return {"products": [
+            {
+                "id": 1000 + i,
+                "title": title,
+                "updated_at": now,
+                "variants": [{"price": f"{10 + i}.00"}],
+                "image": {"src": f"https://cdn.example.com/{i}.png"},
+            }
+            for i, title in enumerate(PRODUCT_TITLES)
+        ]}
+
+    @app.post("/admin/api/{version}/graphql.json")
+    async def graphql(request: Request):
+        body = await request.json()
+        query = body.get("query", "")
+        if "bulkOperationRunQuery" in query:
+            if current and current["status"] == "RUNNING" and time.monotonic() < current["ready_at"]:
+                return {"data": {"bulkOperationRunQuery": {
+                    "bulkOperation": None,
+                    "userErrors": [{"field": None, "message": "A bulk query operation for this app and shop is already in progress"}],
+                }}}
+            inner = (body.get("variables") or {}).get("query", "")
+            filters = {}
+            for op, value in CREATED_RE.findall(inner):
+                filters["created_at_min" if op == ">=" else "created_at_max"] = value
+            op_id = f"gid://shopify/BulkOperation/{next(op_ids)}"
+            bulk_ops[op_id] = filters
+            current.clear()
+            current.update(id=op_id, status="RUNNING", ready_at=time.monotonic() + bulk_seconds)
+            return {"data": {"bulkOperationRunQuery": {
+                "bulkOperation": {"id": op_id, "status": "CREATED"}, "userErrors": [],
+            }}}
+        if "bulkOperationCancel" in query:
+            if current and current["id"] == (body.get("variables") or {}).get("id") and current["status"] == "RUNNING":
+                current["status"] = "CANCELED"
+            return {"data": {"bulkOperationCancel": {"userErrors": []}}}
+        if "currentBulkOperation" in query:
+            if not current:
+                return {"data": {"currentBulkOperation": None}}
+            if current["status"] == "RUNNING" and time.monotonic() >= current["ready_at"]:
+                current["status"] = "COMPLETED"
+            done = current["status"] == "COMPLETED"
+            num = current["id"].rsplit("/", 1)[-1]
+            return {"data": {"currentBulkOperation": {
+                "id": current["id"],
+                "status": current["status"],
+                "errorCode": None,
+                "objectCount": str(len(select(bulk_ops[current["id"]]))) if done else "0",
+                "url": f"{str(request.base_url).rstrip('/')}/bulk/{num}.jsonl" if done else None,
+            }}}
+        return JSONResponse({"errors": [{"message": "unsupported query"}]}, status_code=200)
+
+    @app.get("/bulk/{num}.jsonl")
+    async def bulk_result(num: str):
+        if bulk_file is not None:
+            lines = bulk_file.open("rb")
+        else:
+            lines = bulk_lines(select(bulk_ops[f"gid://shopify/BulkOperation/{num}"]))
+        return StreamingResponse(lines, media_type="application/jsonl")
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--orders", type=int, default=2000, help="synthetic orders to serve")
+    ap.add_argument("--days", type=int, default=90, help="spread orders over this many days")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--bulk-file", type=Path, help="canned JSONL returned by every bulk operation")
+    ap.add_argument("--bulk-seconds", type=float, default=0.5, help="time a bulk operation stays RUNNING")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="added to every Admin API response")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random delay on top of --latency-ms")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with each 429")
+    args = ap.parse_args()
+
+    import uvicorn
+    app = create_app(
+        make_orders(args.orders, args.days, args.seed), args.bulk_file, args.bulk_seconds,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Replay recorded Shopify webhook payloads against a local backend.
+
+    python scripts/replay_webhooks.py scripts/webhook_samples/*.json
+    python scripts/replay_webhooks.py --url http://localhost:8000/webhooks/shopify --topic orders/updated order.json
+
+The topic is taken from the file name (orders_create.json -> orders/create)
+unless --topic is given. Payloads are signed with SHOPIFY_WEBHOOK_SECRET
+(or SHOPIFY_API_SECRET) exactly like Shopify signs them.
+"""
+from pathlib import Path
+import argparse, os, sys
+
+import httpx
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from webhooks import ORDER_TOPICS, sign_webhook  # noqa: E402
+
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+
+def topic_from_name(path: Path) -> str:
+    for topic in ORDER_TOPICS:
+        if path.stem.startswith(topic.replace("/", "_")):
+            return topic
+    raise SystemExit(f"Cannot infer topic from {path.name}; pass --topic")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("files", nargs="+", type=Path)
+    ap.add_argument("--url", default="http://localhost:8000/webhooks/shopify")
+    ap.add_argument("--topic")
+    ap.add_argument("--shop", default=os.getenv("SHOPIFY_STORE_DOMAIN", "example.myshopify.com"))
+    args = ap.parse_args()
+
+    secret = os.getenv("SHOPIFY_WEBHOOK_SECRET") or os.getenv("SHOPIFY_API_SECRET")
+    if not secret:
+        raise SystemExit("Missing SHOPIFY_WEBHOOK_SECRET in .env")
+
+    with httpx.Client(timeout=10) as client:
+        for path in args.files:
+            body = path.read_bytes()
+            topic = args.topic or topic_from_name(path)
+            r = client.post(args.url, content=body, headers={
+                "Content-Type": "application/json",
+                "X-Shopify-Topic": topic,
+                "X-Shopify-Shop-Domain": args.shop,
+                "X-Shopify-Hmac-Sha256": sign_webhook(body, secret),
+            })
+            print(f"{path.name} [{topic}] -> {r.status_code} {r.text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from urllib.parse import urlparse
+import base64, hashlib, hmac, json, time
+
+LEEWAY = 5.0    # seconds of clock skew tolerated on token exp/nbf
+
+
+def _b64url(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def _host(url) -> str | None:
+    return urlparse(url).hostname if isinstance(url, str) and url else None
+
+
+# ---------- Session tokens ----------
+def verify_session_token(token: str, secret: str, api_key: str | None = None) -> str | None:
+    """
+    Shop domain from a Shopify App Bridge session token (an HS256 JWT signed
+    with the app's API secret), or None if the signature, lifetime or
+    audience does not check out.
+    """
+    try:
+        header_b64, claims_b64, sig_b64 = token.split(".")
+        header = json.loads(_b64url(header_b64))
+        claims = json.loads(_b64url(claims_b64))
+        sig = _b64url(sig_b64)
+    except ValueError:      # also covers bad base64 and bad JSON
+        return None
+    if not isinstance(header, dict) or not isinstance(claims, dict) or header.get("alg") != "HS256":
+        return None
+    expected = hmac.new(secret.encode(), f"{header_b64}.{claims_b64}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, sig):
+        return None
+    now = time.time()
+    try:
+        if float(claims["exp"]) < now - LEEWAY or float(claims.get("nbf", 0)) > now + LEEWAY:
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if api_key and claims.get("aud") != api_key:
+        return None
+    shop = _host(claims.get("dest"))
+    # iss is the shop's admin URL; it must name the same shop as dest
+    if shop is None or _host(claims.get("iss")) != shop:
+        return None
+    return shop
+
+
+# ---------- Signed query strings ----------
+def verify_signed_query(params: dict[str, str], secret: str, max_age: float = 3600.0) -> str | None:
+    """
+    Shop domain from a query Shopify signed (app launch URLs): `hmac` is the
+    hex HMAC-SHA256 of the other parameters as sorted `key=value` pairs
+    joined by `&`. None if the signature is wrong or `timestamp` is too old.
+    """
+    received = params.get("hmac")
+    shop = params.get("shop")
+    if not received or not shop:
+        return None
+    message = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if k not in ("hmac", "signature"))
+    expected = hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, received):
+        return None
+    try:
+        if time.time() - float(params["timestamp"]) > max_age:
+            return None
+    except (KeyError, ValueError):
+        return None
+    return shop
@@ -0,0 +1,60 @@
+from fastapi import HTTPException
+from zoneinfo import ZoneInfo  # pip install tzdata if needed
+import asyncio, time
+
+from shopify_client import ShopifyClient
+
+
+# ---------- Shop metadata cache ----------
+class ShopMetaCache:
+    """
+    Process-wide TTL cache for shop.json (timezone, currency, ...).
+    These values almost never change, so one fetch serves every request until
+    the TTL expires or `invalidate()` is called.
+    """
+
+    def __init__(self, client: ShopifyClient, ttl: float = 3600.0):
+        self.client = client
+        self.ttl = ttl
+        self._shop: dict | None = None
+        self._zone: ZoneInfo | None = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._shop is not None and (time.monotonic() - self._fetched_at) < self.ttl
+
+    async def get(self) -> dict:
+        if self._fresh():
+            return self._shop
+        async with self._lock:
+            # another request may have refreshed it while we waited
+            if not self._fresh():
+                data = await self.client.get("shop.json")
+                shop = data.get("shop") or {}
+                tzname = shop.get("iana_timezone")
+                if not tzname:
+                    raise HTTPException(status_code=500, detail="Cannot read shop timezone")
+                self._zone = ZoneInfo(tzname)
+                self._shop = shop
+                self._fetched_at = time.monotonic()
+        return self._shop
+
+    async def timezone_name(self) -> str:
+        return (await self.get())["iana_timezone"]
+
+    async def zone(self) -> ZoneInfo:
+        await self.get()
+        return self._zone
+
+    async def currency(self) -> str | None:
+        return (await self.get()).get("currency")
+
+    def invalidate(self) -> None:
+        self._shop = None
+        self._zone = None
+        self._fetched_at = 0.0
+
+    async def warm(self) -> None:
+        self.invalidate()
+        await self.get()
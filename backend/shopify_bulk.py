@@ -0,0 +1,207 @@
+from typing import AsyncIterator
+from fastapi import HTTPException
+import asyncio, json, logging, time
+
+import httpx
+
+from hedging import time_left
+from metrics import METRICS
+from shopify_client import ShopifyClient
+
+log = logging.getLogger(__name__)
+
+# ---------- GraphQL bulk operations ----------
+ORDERS_BULK_QUERY = """
+{
+  orders(query: "%s", sortKey: CREATED_AT) {
+    edges {
+      node {
+        id
+        createdAt
+        totalPriceSet { shopMoney { amount } }
+        lineItems {
+          edges {
+            node {
+              title
+              quantity
+              originalUnitPriceSet { shopMoney { amount } }
+              product { id }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+RUN_MUTATION = """
+mutation run($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+CANCEL_MUTATION = """
+mutation cancel($id: ID!) {
+  bulkOperationCancel(id: $id) {
+    userErrors { field message }
+  }
+}
+"""
+
+POLL_QUERY = """
+{
+  currentBulkOperation(type: QUERY) { id status errorCode objectCount url }
+}
+"""
+
+TERMINAL = {"COMPLETED", "FAILED", "CANCELED", "EXPIRED"}
+
+
+def gid_to_id(gid: str | None) -> int | None:
+    """"gid://shopify/Order/123" -> 123"""
+    return int(gid.rsplit("/", 1)[-1]) if gid else None
+
+
+def _amount(money_set: dict | None) -> str | None:
+    return ((money_set or {}).get("shopMoney") or {}).get("amount")
+
+
+def order_from_node(node: dict) -> dict:
+    # same shape as a REST orders.json entry, so every summarizer can consume it
+    return {
+        "id": gid_to_id(node["id"]),
+        "created_at": node.get("createdAt"),
+        "total_price": _amount(node.get("totalPriceSet")),
+        "line_items": [],
+    }
+
+
+def line_item_from_node(node: dict) -> dict:
+    return {
+        "product_id": gid_to_id((node.get("product") or {}).get("id")),
+        "title": node.get("title") or "Unknown",
+        "quantity": node.get("quantity") or 0,
+        "price": _amount(node.get("originalUnitPriceSet")),
+    }
+
+
+async def orders_from_jsonl(lines: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """
+    Rebuild orders from a bulk result file. Nested connections come out
+    flattened: each line item is its own line carrying `__parentId`, written
+    right after its order, so only the current order is held in memory.
+    """
+    current = None
+    async for line in lines:
+        if not line.strip():
+            continue
+        node = json.loads(line)
+        parent = node.get("__parentId")
+        if parent is None:
+            if current is not None:
+                yield current
+            current = order_from_node(node)
+        elif current is not None and gid_to_id(parent) == current["id"]:
+            current["line_items"].append(line_item_from_node(node))
+    if current is not None:
+        yield current
+
+
+class BulkOrderExporter:
+    """
+    Streams large order windows through one `bulkOperationRunQuery` instead of
+    hundreds of REST pages. Shopify allows one bulk query per shop at a time,
+    so runs are serialized; downloads of finished results may overlap.
+    Waiting for the lock and for the operation stops at the request deadline
+    (or `timeout`); an operation we stop waiting for is cancelled, so it does
+    not hold the shop's bulk slot for the next caller.
+    """
+
+    def __init__(self, client: ShopifyClient, poll_interval: float = 1.0, max_poll_interval: float = 10.0,
+                 timeout: float = 900.0):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self._lock = asyncio.Lock()
+        self._download: httpx.AsyncClient | None = None
+
+    def _downloader(self) -> httpx.AsyncClient:
+        # results live on signed storage URLs: plain client, no Admin API token
+        if self._download is None:
+            self._download = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=120.0))
+        return self._download
+
+    async def run(self, search: str) -> str | None:
+        """Run a bulk orders query for a Shopify search string; returns the result URL (None if empty)."""
+        deadline = time.monotonic() + time_left(self.timeout)
+        try:
+            await asyncio.wait_for(self._lock.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="bulk operation timed out waiting for the previous one")
+        try:
+            with METRICS.span("shopify_bulk"):
+                data = await self.client.graphql(RUN_MUTATION, {"query": ORDERS_BULK_QUERY % search})
+                result = data.get("bulkOperationRunQuery") or {}
+                if result.get("userErrors"):
+                    raise HTTPException(status_code=409, detail=result["userErrors"])
+                op_id = (result.get("bulkOperation") or {}).get("id")
+                return await self._wait(op_id, deadline)
+        finally:
+            self._lock.release()
+
+    async def _wait(self, op_id: str | None, deadline: float) -> str | None:
+        delay = self.poll_interval
+        while True:
+            op = (await self.client.graphql(POLL_QUERY)).get("currentBulkOperation") or {}
+            if op_id and op.get("id") not in (None, op_id):
+                raise HTTPException(status_code=409, detail="another bulk operation replaced ours")
+            status = op.get("status")
+            if status == "COMPLETED":
+                log.info("bulk operation %s completed: %s objects", op_id, op.get("objectCount"))
+                return op.get("url")
+            if status in TERMINAL:
+                raise HTTPException(status_code=502, detail=f"bulk operation {status}: {op.get('errorCode')}")
+            left = deadline - time.monotonic()
+            if left <= 0:
+                await self._cancel(op_id)
+                raise HTTPException(status_code=504, detail="bulk operation timed out")
+            await asyncio.sleep(min(delay, left))
+            delay = min(delay * 1.5, self.max_poll_interval)
+
+    async def _cancel(self, op_id: str | None) -> None:
+        if not op_id:
+            return
+        try:
+            await self.client.graphql(CANCEL_MUTATION, {"id": op_id})
+        except Exception as e:
+            log.warning("could not cancel bulk operation %s: %s", op_id, e)
+
+    async def _lines(self, url: str) -> AsyncIterator[str]:
+        async with self._downloader().stream("GET", url) as r:
+            r.raise_for_status()
+            try:
+                async for line in r.aiter_lines():
+                    yield line
+            finally:
+                METRICS.inc("shopify_response_bytes_total", r.num_bytes_downloaded)
+
+    async def iter_orders(self, start_iso: str, end_iso: str | None = None) -> AsyncIterator[dict]:
+        """Every order created in [start_iso, end_iso], streamed from the bulk result file."""
+        search = f"created_at:>='{start_iso}'"
+        if end_iso:
+            search += f" AND created_at:<='{end_iso}'"
+        url = await self.run(search)
+        if not url:
+            return
+        async for o in orders_from_jsonl(self._lines(url)):
+            yield o
+
+    async def aclose(self) -> None:
+        if self._download is not None:
+            await self._download.aclose()
+            self._download = None
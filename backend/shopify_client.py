@@ -0,0 +1,292 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+from fastapi import HTTPException
+import asyncio, heapq, itertools, random, time
+import httpx
+
+from metrics import METRICS
+from singleflight import SingleFlight, params_key
+
+
+# ---------- Request scheduling ----------
+# Priority classes: lower runs first when the bucket is tight
+INTERACTIVE, DASHBOARD, BACKGROUND = 0, 1, 2
+request_priority: ContextVar[int] = ContextVar("shopify_request_priority", default=DASHBOARD)
+
+
+@contextmanager
+def use_priority(priority: int):
+    """Run the Shopify calls made inside this block (and tasks it spawns) at `priority`."""
+    token = request_priority.set(priority)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class RequestScheduler:
+    """
+    Central gate in front of every Shopify call. It mirrors Shopify's REST
+    leaky bucket: the level comes from X-Shopify-Shop-Api-Call-Limit
+    ("used/max") on each response and is assumed to drain at `leak_rate`
+    calls/second in between. Calls that would push the projected level past
+    `max - headroom` wait in a priority queue, so interactive chat traffic is
+    let through before dashboard polling and background sync.
+    """
+
+    HEADER = "X-Shopify-Shop-Api-Call-Limit"
+
+    def __init__(self, capacity: int = 40, leak_rate: float = 2.0, headroom: int = 4):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self.level = 0.0
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _drain(self) -> None:
+        now = time.monotonic()
+        self.level = max(0.0, self.level - (now - self._updated) * self.leak_rate)
+        self._updated = now
+
+    def _room(self) -> float:
+        if time.monotonic() < self.paused_until:
+            return 0.0
+        return (self.capacity - self.headroom) - self.level - self.in_flight
+
+    def _dispatch(self) -> None:
+        self._drain()
+        while self._waiters:
+            fut = self._waiters[0][2]
+            if fut.done():              # caller gave up while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self._room() < 1:
+                break
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            fut.set_result(None)
+        if self._waiters and self._timer is None:
+            now = time.monotonic()
+            if now < self.paused_until:
+                delay = self.paused_until - now
+            else:
+                delay = max(0.05, (1 - self._room()) / self.leak_rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    async def acquire(self, priority: int = DASHBOARD) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():   # granted just as we were cancelled
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+
+    def release(self, response: httpx.Response | None) -> None:
+        self.in_flight -= 1
+        self._drain()
+        header = response.headers.get(self.HEADER) if response is not None else None
+        if header and "/" in header:
+            used, cap = header.split("/", 1)
+            try:
+                self.level, self.capacity = float(used), int(cap)
+            except ValueError:
+                pass
+        elif response is not None:
+            self.level += 1
+        self._dispatch()
+
+    def pause(self, seconds: float) -> None:
+        """Shopify said slow down: hold every queued call for `seconds`."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.level = float(self.capacity)
+
+
+def retry_delay(response: httpx.Response | None, attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    # honour Retry-After when Shopify sends it, otherwise exponential backoff; always jittered
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    try:
+        wait = float(retry_after) if retry_after else min(cap, base * 2 ** attempt)
+    except ValueError:
+        wait = min(cap, base * 2 ** attempt)
+    return wait + random.uniform(0, base * 2 ** attempt)
+
+
+# ---------- Pooled async Shopify client ----------
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class ShopifyClient:
+    """
+    Long-lived Admin API client. One httpx.AsyncClient (and so one connection
+    pool) is shared by every request instead of a fresh TCP+TLS handshake per call.
+    """
+
+    def __init__(
+        self,
+        store_domain: str | None,
+        access_token: str | None,
+        api_version: str,
+        *,
+        pool_size: int = 20,
+        keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 20.0,
+        leak_rate: float = 2.0,
+        max_retries: int = 4,
+        api_base: str | None = None,
+    ):
+        self.store_domain = store_domain
+        self.api_base = api_base        # e.g. http://127.0.0.1:8900 for a local fake Shopify
+        self.access_token = access_token
+        self.api_version = api_version
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2 and _h2_available()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.scheduler = RequestScheduler(leak_rate=leak_rate)
+        self.flights = SingleFlight()     # identical concurrent GETs share one upstream call
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def base_url(self) -> str:
+        origin = self.api_base.rstrip("/") if self.api_base else f"https://{self.store_domain}"
+        return f"{origin}/admin/api/{self.api_version}/"
+
+    def _http(self) -> httpx.AsyncClient:
+        if not self.store_domain or not self.access_token:
+            raise RuntimeError("Missing SHOPIFY_STORE_DOMAIN or SHOPIFY_ACCESS_TOKEN in .env")
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "X-Shopify-Access-Token": self.access_token,
+                    "Content-Type": "application/json",
+                },
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def _request(self, path: str, params: dict | None = None) -> httpx.Response:
+        return await self.flights.do((str(path), params_key(params)), lambda: self._fetch(path, params))
+
+    async def _fetch(self, path: str, params: dict | None, method: str = "GET",
+                     json: dict | None = None) -> httpx.Response:
+        with METRICS.span("shopify"):
+            return await self._fetch_with_retries(path, params, method, json)
+
+    async def _fetch_with_retries(self, path: str, params: dict | None, method: str,
+                                  json: dict | None) -> httpx.Response:
+        http = self._http()
+        endpoint = endpoint_name(path)
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(request_priority.get())
+            r = None
+            try:
+                r = await http.request(method, path, params=params, json=json)
+            except httpx.TransportError:
+                METRICS.inc("shopify_requests_total", endpoint=endpoint, status="error")
+                if attempt == self.max_retries:
+                    raise
+            finally:
+                self.scheduler.release(r)
+            if r is not None:
+                METRICS.inc("shopify_requests_total", endpoint=endpoint, status=r.status_code)
+                METRICS.inc("shopify_response_bytes_total", len(r.content))
+            if r is not None and r.status_code not in RETRY_STATUSES:
+                break
+            if attempt == self.max_retries:
+                break
+            METRICS.inc("shopify_retries_total", reason=r.status_code if r is not None else "transport")
+            delay = retry_delay(r, attempt)
+            if r is not None and r.status_code == 429:
+                self.scheduler.pause(delay)
+            await asyncio.sleep(delay)
+        if r.status_code >= 400:
+            raise HTTPException(status_code=r.status_code, detail=r.text)
+        return r
+
+    async def get(self, path: str, params: dict | None = None) -> dict:
+        return (await self._request(path, params=params)).json()
+
+    async def graphql(self, query: str, variables: dict | None = None) -> dict:
+        """POST to the GraphQL Admin API; top-level `errors` become a 502. Never coalesced."""
+        r = await self._fetch("graphql.json", None, "POST", {"query": query, "variables": variables or {}})
+        body = r.json()
+        if body.get("errors"):
+            raise HTTPException(status_code=502, detail=body["errors"])
+        return body.get("data") or {}
+
+    async def paginate(
+        self, path: str, params: dict | None = None, key: str | None = None
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Yield every page of a REST list endpoint, following the Link header's
+        rel="next" page_info cursor until Shopify stops sending one.
+        """
+        key = key or path.removesuffix(".json").rsplit("/", 1)[-1]
+        async for r in self._pages(path, params):
+            yield r.json().get(key, [])
+
+    async def paginate_raw(self, path: str, params: dict | None = None) -> AsyncIterator[bytes]:
+        """Like paginate(), but yields each page's undecoded body for callers with their own parser."""
+        async for r in self._pages(path, params):
+            yield r.content
+
+    async def _pages(self, path: str, params: dict | None) -> AsyncIterator[httpx.Response]:
+        fields = (params or {}).get("fields")
+        r = await self._request(path, params=params)
+        while True:
+            yield r
+            next_url = r.links.get("next", {}).get("url")
+            if not next_url:
+                return
+            # cursor requests may only carry limit/fields; the filters live in page_info
+            url = httpx.URL(next_url)
+            if fields and "fields" not in url.params:
+                url = url.copy_merge_params({"fields": fields})
+            r = await self._request(str(url))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def endpoint_name(path: str) -> str:
+    """Low-cardinality metrics label: "orders.json" for both relative paths and cursor URLs."""
+    path = httpx.URL(str(path)).path
+    if "/admin/api/" in path:
+        path = path.split("/admin/api/", 1)[1].split("/", 1)[-1]
+    return path.lstrip("/")
+
+
+def _h2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional `h2` package is installed
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
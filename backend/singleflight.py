@@ -0,0 +1,42 @@
+from typing import Any, Awaitable, Callable, Hashable
+import asyncio
+
+
+# ---------- Single-flight request coalescing ----------
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one: the first caller for a key
+    starts the work, everyone who arrives while it is running awaits the same
+    result. The work runs as its own task, so one caller disconnecting does
+    not cancel it for the others. Nothing is cached once it finishes.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.shared = 0
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finished(k, t))
+            self.started += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()        # mark retrieved even if every waiter went away
+
+    def stats(self) -> dict:
+        return {"started": self.started, "shared": self.shared, "in_flight": len(self._inflight)}
+
+
+def params_key(params: dict | None) -> tuple:
+    # order-insensitive, hashable view of query params
+    return tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
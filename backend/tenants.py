@@ -0,0 +1,224 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable
+from fastapi import HTTPException
+import asyncio, json
+
+from catalog import ProductCatalog
+from order_store import OrderStore, OrderSync
+from shop_meta import ShopMetaCache
+from shopify_bulk import BulkOrderExporter
+from shopify_client import BACKGROUND, ShopifyClient, request_priority
+from warmup import FactsWarmer
+
+SHOP_HEADER = "X-Shopify-Shop-Domain"
+
+
+# ---------- Tenants ----------
+class Tenant:
+    """Everything that belongs to one shop: its pooled client (and so its rate bucket), caches and store."""
+
+    def __init__(self, domain: str | None, client: ShopifyClient, shop_meta: ShopMetaCache, *,
+                 order_store: OrderStore | None = None, order_sync: OrderSync | None = None,
+                 bulk: BulkOrderExporter | None = None, warmer: FactsWarmer | None = None,
+                 catalog: ProductCatalog | None = None, fetch_gate: "FairGate | None" = None):
+        self.domain = domain
+        self.client = client
+        self.shop_meta = shop_meta
+        self.order_store = order_store
+        self.order_sync = order_sync
+        self.bulk = bulk
+        self.warmer = warmer
+        self.catalog = catalog
+        self.fetch_gate = fetch_gate or FairGate(4)     # this shop's concurrent order-window slices
+        self._tasks: list[asyncio.Task] = []
+
+    def start_background(self) -> None:
+        """Start order sync, catalog sync and facts warm-up; their tasks see this shop as the current tenant."""
+        if self._tasks:
+            return
+        token = current_tenant.set(self)
+        try:
+            if self.order_sync is not None:
+                self._tasks.append(asyncio.create_task(self.order_sync.run()))
+            if self.catalog is not None:
+                self._tasks.append(asyncio.create_task(self.catalog.run()))
+            if self.warmer is not None:
+                self._tasks.append(asyncio.create_task(self.warmer.run()))
+        finally:
+            current_tenant.reset(token)
+
+    async def aclose(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        await self.client.aclose()
+        if self.bulk is not None:
+            await self.bulk.aclose()
+        if self.order_store is not None:
+            self.order_store.close()
+
+
+def normalize_shop(domain: str) -> str:
+    return domain.strip().lower().removeprefix("https://").removeprefix("http://").rstrip("/")
+
+
+def load_credentials(path: str | None) -> dict[str, str]:
+    """
+    {shop domain: access token} from a JSON file shaped either
+    {"a.myshopify.com": "shpat_..."} or {"a.myshopify.com": {"access_token": "shpat_..."}}.
+    """
+    if not path:
+        return {}
+    raw = json.loads(Path(path).read_text())
+    return {
+        normalize_shop(shop): value["access_token"] if isinstance(value, dict) else value
+        for shop, value in raw.items()
+    }
+
+
+class TenantRegistry:
+    """
+    Shops this process serves. Tenants are built lazily by `factory` on
+    first use, so hundreds of configured shops only cost memory once they
+    see traffic. Requests without a shop go to the default tenant.
+    """
+
+    def __init__(self, factory: Callable[[str | None, str | None], Tenant],
+                 credentials: dict[str, str], default_domain: str | None, default_token: str | None):
+        self.factory = factory
+        self.credentials = dict(credentials)
+        self.default_domain = normalize_shop(default_domain) if default_domain else None
+        if self.default_domain and default_token:
+            self.credentials.setdefault(self.default_domain, default_token)
+        self._tenants: dict[str | None, Tenant] = {}
+
+    @property
+    def default(self) -> Tenant:
+        return self._get(self.default_domain)
+
+    def _get(self, domain: str | None) -> Tenant:
+        tenant = self._tenants.get(domain)
+        if tenant is None:
+            tenant = self._tenants[domain] = self.factory(domain, self.credentials.get(domain))
+            if _loop_running():     # otherwise the lifespan starts it
+                tenant.start_background()
+        return tenant
+
+    def resolve(self, domain: str | None) -> Tenant:
+        if not domain:
+            return self.default
+        domain = normalize_shop(domain)
+        if domain not in self.credentials:
+            raise HTTPException(status_code=404, detail=f"Unknown shop: {domain}")
+        return self._get(domain)
+
+    def active(self) -> list[Tenant]:
+        return list(self._tenants.values())
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    async def aclose(self) -> None:
+        for tenant in self._tenants.values():
+            await tenant.aclose()
+        self._tenants.clear()
+
+
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+current_tenant: ContextVar[Tenant | None] = ContextVar("current_tenant", default=None)
+
+
+# ---------- Fair scheduling ----------
+class FairGate:
+    """
+    Concurrency limit for order-window fetches: one per tenant bounds that
+    shop's parallelism, one process-wide caps the total. Waiters are served by priority class
+    (the caller's request_priority), then round-robin between tenants within
+    a class: a shop with fifty queued fetches gets one slot per turn, like
+    everyone else, so it cannot starve a quiet shop. Background work never
+    takes the last `headroom` slots, so a sync or warm-up cannot make
+    interactive and dashboard fetches queue behind whole window slices.
+    Unqueued callers go straight in.
+    """
+
+    def __init__(self, capacity: int, headroom: int = 1):
+        self.capacity = capacity
+        self.headroom = min(headroom, capacity - 1)
+        self.active = 0
+        self._queues: dict[tuple[int, str | None], deque[asyncio.Future]] = {}
+        self._turns: dict[int, deque[str | None]] = {}    # priority -> tenants with waiters, in serving order
+
+    @asynccontextmanager
+    async def slot(self, key: str | None):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _limit(self, priority: int) -> int:
+        return self.capacity - self.headroom if priority >= BACKGROUND else self.capacity
+
+    async def acquire(self, key: str | None, priority: int | None = None) -> None:
+        priority = request_priority.get() if priority is None else priority
+        if self.active < self._limit(priority) and not any(p <= priority for p in self._turns):
+            self.active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        qkey = (priority, key)
+        queue = self._queues.get(qkey)
+        if queue is None:
+            queue = self._queues[qkey] = deque()
+            self._turns.setdefault(priority, deque()).append(key)
+        queue.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()      # the slot was handed to us as we were cancelled; pass it on
+            elif fut in queue:
+                queue.remove(fut)
+                if not queue:
+                    self._drop(priority, key)
+            raise
+
+    def _drop(self, priority: int, key: str | None) -> None:
+        del self._queues[(priority, key)]
+        turns = self._turns[priority]
+        turns.remove(key)
+        if not turns:
+            del self._turns[priority]
+
+    def release(self) -> None:
+        self.active -= 1
+        while self._turns:
+            priority = min(self._turns)
+            if self.active >= self._limit(priority):
+                break
+            turns = self._turns[priority]
+            key = turns.popleft()
+            queue = self._queues[(priority, key)]
+            fut = queue.popleft()
+            if queue:
+                turns.append(key)     # back of the line
+            else:
+                del self._queues[(priority, key)]
+                if not turns:
+                    del self._turns[priority]
+            if not fut.done():
+                self.active += 1
+                fut.set_result(None)
+
+    def stats(self) -> dict:
+        return {"capacity": self.capacity, "headroom": self.headroom, "active": self.active,
+                "waiting": {f"{k}:{p}": len(q) for (p, k), q in self._queues.items()}}
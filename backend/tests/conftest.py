@@ -0,0 +1,5 @@
+from pathlib import Path
+import sys
+
+# backend modules import each other flat (`from orders_model import ...`), as uvicorn runs them
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,136 @@
+import base64, hashlib, hmac, json, time
+
+import pytest
+
+from shop_auth import verify_session_token, verify_signed_query
+
+SECRET = "app-secret"
+API_KEY = "app-key"
+SHOP = "demo.myshopify.com"
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_token(claims, header=None, secret: str = SECRET) -> str:
+    head = b64url(json.dumps(header or {"alg": "HS256", "typ": "JWT"}).encode())
+    body = b64url(json.dumps(claims).encode())
+    sig = hmac.new(secret.encode(), f"{head}.{body}".encode(), hashlib.sha256).digest()
+    return f"{head}.{body}.{b64url(sig)}"
+
+
+def claims(**overrides) -> dict:
+    now = time.time()
+    base = {
+        "iss": f"https://{SHOP}/admin",
+        "dest": f"https://{SHOP}",
+        "aud": API_KEY,
+        "exp": now + 60,
+        "nbf": now - 5,
+    }
+    return {**base, **overrides}
+
+
+def signed(params: dict, secret: str = SECRET) -> dict:
+    message = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return {**params, "hmac": hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()}
+
+
+# ---------- Session tokens ----------
+def test_good_token_names_the_shop():
+    assert verify_session_token(make_token(claims()), SECRET, API_KEY) == SHOP
+
+
+def test_audience_is_optional_without_api_key():
+    assert verify_session_token(make_token(claims(aud="someone-else")), SECRET) == SHOP
+
+
+def test_bad_signature():
+    assert verify_session_token(make_token(claims(), secret="wrong"), SECRET, API_KEY) is None
+
+
+def test_tampered_claims():
+    head, _, sig = make_token(claims()).split(".")
+    forged = b64url(json.dumps(claims(dest="https://other.myshopify.com")).encode())
+    assert verify_session_token(f"{head}.{forged}.{sig}", SECRET, API_KEY) is None
+
+
+def test_expired():
+    assert verify_session_token(make_token(claims(exp=time.time() - 60)), SECRET, API_KEY) is None
+
+
+def test_not_yet_valid():
+    assert verify_session_token(make_token(claims(nbf=time.time() + 60)), SECRET, API_KEY) is None
+
+
+def test_wrong_audience():
+    assert verify_session_token(make_token(claims(aud="someone-else")), SECRET, API_KEY) is None
+
+
+def test_iss_dest_mismatch():
+    token = make_token(claims(iss="https://other.myshopify.com/admin"))
+    assert verify_session_token(token, SECRET, API_KEY) is None
+
+
+def test_other_algorithm():
+    assert verify_session_token(make_token(claims(), header={"alg": "none"}), SECRET, API_KEY) is None
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "a.b",
+    "a.b.c.d",
+    "!!.!!.!!",
+    "W10.W10.eA",                           # header and claims are JSON arrays
+    "bnVsbA.bnVsbA.eA",                     # ... JSON null
+    "e30.e30.",                             # {} header: no alg
+])
+def test_malformed(token):
+    assert verify_session_token(token, SECRET, API_KEY) is None
+
+
+@pytest.mark.parametrize("overrides", [
+    {"exp": "soon"},
+    {"exp": None},
+    {"dest": 42},
+    {"dest": None},
+])
+def test_malformed_claims(overrides):
+    assert verify_session_token(make_token(claims(**overrides)), SECRET, API_KEY) is None
+
+
+def test_non_object_claims_with_valid_signature():
+    assert verify_session_token(make_token(["not", "a", "dict"]), SECRET, API_KEY) is None
+
+
+# ---------- Signed query strings ----------
+def test_signed_query_names_the_shop():
+    params = signed({"shop": SHOP, "timestamp": str(int(time.time())), "host": "abc"})
+    assert verify_signed_query(params, SECRET) == SHOP
+
+
+def test_signed_query_bad_signature():
+    params = signed({"shop": SHOP, "timestamp": str(int(time.time()))}, secret="wrong")
+    assert verify_signed_query(params, SECRET) is None
+
+
+def test_signed_query_tampered_shop():
+    params = signed({"shop": SHOP, "timestamp": str(int(time.time()))})
+    assert verify_signed_query({**params, "shop": "other.myshopify.com"}, SECRET) is None
+
+
+def test_signed_query_expired():
+    params = signed({"shop": SHOP, "timestamp": str(int(time.time()) - 7200)})
+    assert verify_signed_query(params, SECRET, max_age=3600) is None
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"shop": SHOP},
+    {"hmac": "00"},
+    signed({"shop": SHOP}),                         # no timestamp
+    signed({"shop": SHOP, "timestamp": "yesterday"}),
+])
+def test_signed_query_malformed(params):
+    assert verify_signed_query(params, SECRET) is None
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, time as dtime
+from typing import Awaitable, Callable
+from zoneinfo import ZoneInfo
+import asyncio, logging, time
+
+from metrics import METRICS
+from shopify_client import BACKGROUND, use_priority
+
+log = logging.getLogger(__name__)
+
+CHAT_RANGES = (1, 7, 30)    # every range_days chat_range_days() can produce
+
+
+# ---------- Precomputed chat facts ----------
+class FactsWarmer:
+    """
+    Keeps the facts for every chat range precomputed. `run()` refreshes them
+    every `interval` seconds and just after midnight in the shop's timezone;
+    `get()` serves them while they are at most `max_age` seconds old and the
+    data `version` they were computed from is current, and computes on
+    demand otherwise. `compute(ranges)` returns {range_days: facts} for
+    several ranges at once, so a refresh is one shared fetch. Refreshes wait
+    until `ready()` (e.g. the order store finished its backfill), so warm-up
+    never pages history from Shopify that the store is about to hold.
+    """
+
+    def __init__(self, compute: Callable[[list[int]], Awaitable[dict[int, dict]]],
+                 zone: Callable[[], Awaitable[ZoneInfo]], version: Callable[[], object] | None = None,
+                 ready: Callable[[], bool] | None = None,
+                 ranges: tuple[int, ...] = CHAT_RANGES, interval: float = 300.0, max_age: float = 900.0):
+        self.compute = compute
+        self.zone = zone
+        self.version = version or (lambda: None)
+        self.ready = ready or (lambda: True)
+        self.ranges = ranges
+        self.interval = interval
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.last_refresh: datetime | None = None
+        self._facts: dict[int, tuple[float, object, dict]] = {}    # range_days -> (monotonic time computed, version, facts)
+
+    def age(self, range_days: int) -> float | None:
+        entry = self._facts.get(range_days)
+        return time.monotonic() - entry[0] if entry else None
+
+    def fresh(self, range_days: int) -> bool:
+        age = self.age(range_days)
+        return age is not None and age <= self.max_age and self._facts[range_days][1] == self.version()
+
+    async def get(self, range_days: int) -> dict:
+        age = self.age(range_days)
+        if self.fresh(range_days):
+            self.hits += 1
+            METRICS.inc("warm_facts_total", result="hit")
+            return self._facts[range_days][2]
+        self.misses += 1
+        METRICS.inc("warm_facts_total", result="stale" if age is not None else "miss")
+        return (await self.refresh([range_days]))[range_days]
+
+    async def refresh(self, ranges: list[int]) -> dict[int, dict]:
+        # read the version first: a write landing mid-compute leaves these facts stale, not wrongly fresh
+        started, version = time.monotonic(), self.version()
+        facts = await self.compute(ranges)
+        for r in ranges:
+            self._facts[r] = (started, version, facts[r])
+        return facts
+
+    async def refresh_all(self) -> None:
+        try:
+            await self.refresh(list(self.ranges))
+        except Exception as e:
+            log.warning("facts warm-up for %s failed: %s", "/".join(f"{r}d" for r in self.ranges), e)
+        self.last_refresh = datetime.now().astimezone()
+
+    async def _seconds_to_next_refresh(self) -> float:
+        # whichever comes first: the cadence or the shop's next local midnight
+        try:
+            tz = await self.zone()
+        except Exception:
+            return self.interval
+        now = datetime.now(tz)
+        midnight = datetime.combine(now.date() + timedelta(days=1), dtime.min, tzinfo=tz)
+        return max(1.0, min(self.interval, midnight.timestamp() - now.timestamp() + 1))
+
+    async def run(self) -> None:
+        with use_priority(BACKGROUND):
+            while True:
+                if not self.ready():
+                    await asyncio.sleep(min(self.interval, 5.0))
+                    continue
+                try:
+                    await self.refresh_all()
+                    delay = await self._seconds_to_next_refresh()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("facts warm-up failed: %s", e)
+                    delay = self.interval
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "interval": self.interval,
+            "max_age": self.max_age,
+            "age_seconds": {r: round(a, 1) if (a := self.age(r)) is not None else None for r in self.ranges},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
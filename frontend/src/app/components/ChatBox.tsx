@@ -4,7 +4,7 @@ import { useState, useEffect } from 'react'
 
 type Role = 'user' | 'assistant'
 type Msg = { role: Role; content: string }
-type ChatResponse = { answer: string }
+type StreamEvent = { event: string; data: { text?: string; answer?: string; message?: string } }
 
 const backend = process.env.NEXT_PUBLIC_BACKEND_URL ?? 'http://127.0.0.1:8000'
 
@@ -18,6 +18,22 @@ function getErrorMessage(err: unknown): string {
 	}
 }
 
+// Split an SSE buffer into complete events; returns the unparsed remainder
+function parseEvents(buffer: string): [StreamEvent[], string] {
+	const blocks = buffer.split('\n\n')
+	const rest = blocks.pop() ?? ''
+	const events = blocks.map((block) => {
+		let event = 'message'
+		let data = ''
+		for (const line of block.split('\n')) {
+			if (line.startsWith('event: ')) event = line.slice(7)
+			else if (line.startsWith('data: ')) data += line.slice(6)
+		}
+		return { event, data: data ? JSON.parse(data) : {} }
+	})
+	return [events, rest]
+}
+
 export default function ChatBox() {
 	const [msgs, setMsgs] = useState<Msg[]>([])
 	const [input, setInput] = useState('')
@@ -40,23 +56,39 @@ export default function ChatBox() {
 		setMsgs((m) => [...m, { role: 'user', content: q }])
 		setLoading(true)
 
+		// placeholder assistant message that tokens are appended to as they stream in
+		const setAnswer = (update: (prev: string) => string) =>
+			setMsgs((m) => [
+				...m.slice(0, -1),
+				{ role: 'assistant', content: update(m[m.length - 1].content) },
+			])
+		setMsgs((m) => [...m, { role: 'assistant', content: '' }])
+
 		try {
-			const res = await fetch(`${backend}/chat`, {
+			const res = await fetch(`${backend}/chat/stream`, {
 				method: 'POST',
 				headers: { 'Content-Type': 'application/json' },
 				body: JSON.stringify({ question: q }),
 			})
-			if (!res.ok) throw new Error(`HTTP ${res.status}`)
-			const data: ChatResponse = await res.json()
-			setMsgs((m) => [
-				...m,
-				{ role: 'assistant', content: data.answer ?? 'No answer.' },
-			])
+			if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`)
+
+			const reader = res.body.getReader()
+			const decoder = new TextDecoder()
+			let buffer = ''
+			for (;;) {
+				const { done, value } = await reader.read()
+				if (done) break
+				buffer += decoder.decode(value, { stream: true })
+				const [events, rest] = parseEvents(buffer)
+				buffer = rest
+				for (const { event, data } of events) {
+					if (event === 'token') setAnswer((prev) => prev + (data.text ?? ''))
+					else if (event === 'done') setAnswer(() => data.answer || 'No answer.')
+					else if (event === 'error') setAnswer(() => data.message ?? 'Error')
+				}
+			}
 		} catch (err: unknown) {
-			setMsgs((m) => [
-				...m,
-				{ role: 'assistant', content: `Error: ${getErrorMessage(err)}` },
-			])
+			setAnswer(() => `Error: ${getErrorMessage(err)}`)
 		} finally {
 			setLoading(false)
 		}